@@ -1,37 +1,96 @@
 
 import importlib
 import os
+import uuid
 from dotenv import load_dotenv
 load_dotenv()
 import uvicorn
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, Response, Depends
 from fastapi import Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from strawberry.fastapi import GraphQLRouter
-from strawberry.extensions import QueryDepthLimiter
+from strawberry.extensions import QueryDepthLimiter, ParserCache, ValidationCache
 import strawberry
 
 from business.queries import Query
 from business.mutations import Mutation
+from business.exports import router as export_router
 from core import log
-from core.depends import get_context
+from core.logger import request_id
+from core.depends import get_context, internal_only
+from core.db_config import pool_stats, replica_lag, statement_stats
+from core.metrics import snapshot, render
+from core.entity_cache import entity_cache
+from core.extensions import UnitOfWork, ReleaseSession, Metrics, OperationName
+from core.slow_queries import slow_queries
+from core.cost import QueryCost
+from core.persisted_queries import PersistedQueryRouter
+from core.constants import AppConstants as AC
+from core.http_client import close_http_client
+from core.jwks import jwks_client
 from core.custom_exceptions import TriggerException
 
 app = FastAPI(title='karari')
 
+tracing_extensions = []
+if AC.TRACING_EXPORTER != "none":
+    from strawberry.extensions.tracing import OpenTelemetryExtension
+    from core.tracing import configure_tracing, instrument_engines, instrument_http_client, propagate_trace_context
+    from core.db_config import engines
+    from core.http_client import event_hooks
+    if configure_tracing():
+        instrument_engines(engines)
+        instrument_http_client(event_hooks)
+        app.middleware("http")(propagate_trace_context)
+        tracing_extensions.append(OpenTelemetryExtension)
+
 schema = strawberry.Schema(Query, Mutation, extensions=[
-        QueryDepthLimiter(max_depth=3),
+        *tracing_extensions,
+        Metrics,
+        OperationName,
+        QueryDepthLimiter(max_depth=5),
+        ParserCache(maxsize=AC.DOCUMENT_CACHE_SIZE),
+        ValidationCache(maxsize=AC.DOCUMENT_CACHE_SIZE),
+        QueryCost,
+        UnitOfWork,
+        ReleaseSession,
     ])
 
-graphql_app = GraphQLRouter(
+graphql_app = PersistedQueryRouter(
     schema,
     context_getter=get_context
     )
 
 app.include_router(graphql_app, prefix="/graphql")
+app.include_router(export_router)
+
+@app.middleware("http")
+async def bind_request_id(request: Request, call_next):
+    """
+    Tag the logs of a request with its X-Request-ID header, or a generated id, and echo it in the response
+    """
+    token = request_id.set(request.headers.get("X-Request-ID") or uuid.uuid4().hex)
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id.get()
+        return response
+    finally:
+        request_id.reset(token)
+
+
+@app.on_event("startup")
+async def startup():
+    if AC.AUTH_MODE == "local":
+        jwks_client.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await jwks_client.stop()
+    await close_http_client()
+
 
 @app.get('/')
 async def root():
@@ -39,6 +98,36 @@ async def root():
     return {"message": "karari API, generated by ZeKoder"}
 
 
+@app.get('/metrics', dependencies=[Depends(internal_only)])
+async def metrics():
+    """Operation, resolver, SQL, pool, cache and zeauth metrics in the Prometheus text format"""
+    return Response(render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get('/internal/db/pools', dependencies=[Depends(internal_only)])
+async def database_pools():
+    """Connection pool usage, checkout wait times and timeouts of the primary and replica engines, and the replicas replay lag"""
+    return {"pools": pool_stats(), "metrics": snapshot("db_pool_"), "replica_lag": await replica_lag()}
+
+
+@app.get('/internal/db/slow-queries', dependencies=[Depends(internal_only)])
+async def database_slow_queries():
+    """Most recent statements slower than SLOW_QUERY_THRESHOLD, with their sampled EXPLAIN plans"""
+    return {"slow_queries": list(slow_queries)}
+
+
+@app.get('/internal/db/statements', dependencies=[Depends(internal_only)])
+async def database_statements():
+    """Normalized statements with their execution count and total time, the input of python -m core.index_advisor"""
+    return {"statements": statement_stats()}
+
+
+@app.get('/internal/cache', dependencies=[Depends(internal_only)])
+async def entity_cache_stats():
+    """Size, hit and eviction counters of the entity cache"""
+    return {"cache": entity_cache.stats() if entity_cache else None, "metrics": snapshot("entity_cache_")}
+
+
 @app.exception_handler(TriggerException)
 async def trigger_exception_handler(request: Request, exc: TriggerException):
     """
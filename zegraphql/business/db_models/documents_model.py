@@ -35,7 +35,7 @@ class DocumentModel(BaseModel):
 
 
     industry_document = mapped_column(UUID(as_uuid=True), ForeignKey(os.environ.get('DEFAULT_SCHEMA', 'public') + ".industries.id"))
-    industry_document__details = relationship("IndustryModel", foreign_keys=[industry_document], back_populates='industry_document', lazy='selectin')
+    industry_document__details = relationship("IndustryModel", foreign_keys=[industry_document], back_populates='industry_document', lazy='raise_on_sql')
     category: Mapped[str] = mapped_column(Text, nullable=False, default=None)
     tags: Mapped[str] = mapped_column(Text, nullable=True, default=None)
 
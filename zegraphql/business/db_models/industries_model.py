@@ -30,7 +30,7 @@ class IndustryModel(BaseModel):
 
 
     from business.db_models.documents_model import DocumentModel
-    industry_document = relationship('DocumentModel', foreign_keys=[DocumentModel.industry_document], back_populates='industry_document__details', lazy='selectin')
+    industry_document = relationship('DocumentModel', foreign_keys=[DocumentModel.industry_document], back_populates='industry_document__details', lazy='raise_on_sql')
     industry_name: Mapped[str] = mapped_column(Text, nullable=True, default=None)
 
     @classmethod
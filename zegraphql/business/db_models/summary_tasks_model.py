@@ -5,9 +5,9 @@ import datetime
 
 from fastapi import HTTPException
 from sqlalchemy import DATETIME, String, ForeignKey
-from sqlalchemy import DATE, Column, Text, ARRAY
+from sqlalchemy import DATE, Column, Text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy import select
 from core.base_model import BaseModel
 from core.manager import Manager
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from business.db_models.documents_model import DocumentModel, DocumentsAccess
+from business.db_models.industries_model import IndustryModel, IndustriesAccess
+from business.db_models.summary_tasks_model import SummaryTaskModel, SummaryTasksAccess
+from core.auth import Protect
+from core.export import ExportFormat, MEDIA_TYPES, stream_export
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+@router.get("/documents", dependencies=[Depends(Protect(DocumentsAccess.list_roles()).as_dependency)])
+async def export_documents(format: ExportFormat = ExportFormat.ndjson):
+    """Stream every document of the current tenant as NDJSON or CSV"""
+    return StreamingResponse(stream_export(DocumentModel, format), media_type=MEDIA_TYPES[format])
+
+
+@router.get("/industries", dependencies=[Depends(Protect(IndustriesAccess.list_roles()).as_dependency)])
+async def export_industries(format: ExportFormat = ExportFormat.ndjson):
+    """Stream every industry of the current tenant as NDJSON or CSV"""
+    return StreamingResponse(stream_export(IndustryModel, format), media_type=MEDIA_TYPES[format])
+
+
+@router.get("/summary-tasks", dependencies=[Depends(Protect(SummaryTasksAccess.list_roles()).as_dependency)])
+async def export_summary_tasks(format: ExportFormat = ExportFormat.ndjson):
+    """Stream every summary task of the current tenant as NDJSON or CSV"""
+    return StreamingResponse(stream_export(SummaryTaskModel, format), media_type=MEDIA_TYPES[format])
@@ -5,6 +5,7 @@ from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
 from business.types import DocumentType, CreateDocumentInput, UpdateDocumentInput
 from business.db_models.documents_model import DocumentModel, DocumentsAccess
+from core.custom_exceptions import TriggerException
 from core.constants import AppConstants as AC
 from core.depends import GraphQLContext
 from core.auth import Protect
@@ -42,20 +43,19 @@ class DocumentMutation:
         db = info.context.db
         try:
             obj = DocumentModel.objects(db)
-            data = await obj.get(id=document_id)
-            if not data:
-                raise HTTPException(404, f"<{document_id}> record not found in documents")
             new_data = input.to_dict(exclude_null=True)
             kwargs = {
                 "model_data": new_data,
                 "signal_data": {
                     "jwt": info.context.jwt,
                     "new_data": new_data,
-                    "old_data": data.to_dict() if data else {},
+                    "old_data": {},
                     "well_known_urls": {"zeauth": AC.ZEAUTH_BASE_URL, "self": str(info.context.request.base_url)}
                 }
             }
             result = await obj.update(document_id, **kwargs)
+            if not result:
+                raise HTTPException(404, f"<{document_id}> record not found in documents")
             return result
         except HTTPException as e:
             raise e
@@ -92,30 +92,16 @@ class DocumentMutation:
     async def upsert_multiple_documents(self, inputs: List[CreateDocumentInput], info: strawberry.Info[GraphQLContext]) -> List[DocumentType]:
         db = info.context.db
         try:
-            new_items, errors_info = [], []
-            for document_index, document in enumerate(inputs):
-                try:
-                    obj = DocumentModel.objects(db)
-                    new_data = document.to_dict(exclude_null=True)
-                    data = await obj.get(id=new_data.get('id'))
-                    kwargs = {
-                        "model_data": new_data,
-                        "signal_data": {
-                            "jwt": info.context.jwt,
-                            "new_data": new_data,
-                            "old_data": {},
-                            "well_known_urls": {"zeauth": AC.ZEAUTH_BASE_URL, "self": str(info.context.request.base_url)}
-                        }
-                    }
-                    if data:
-                        kwargs['signal_data']['old_data'] = data.to_dict() if data else {}
-                        await obj.update(obj_id=new_data['id'], **kwargs)
-                        new_items.append(data)
-                    else:
-                        new_document = await obj.create(**kwargs)
-                        new_items.append(new_document)
-                except HTTPException as e:
-                    errors_info.append({"index": document_index, "errors": e.detail})
+            obj = DocumentModel.objects(db)
+            kwargs = {
+                "signal_data": {
+                    "jwt": info.context.jwt,
+                    "well_known_urls": {"zeauth": AC.ZEAUTH_BASE_URL, "self": str(info.context.request.base_url)}
+                }
+            }
+            new_items, errors_info = await obj.upsert_multiple([document.to_dict(exclude_null=True) for document in inputs], **kwargs)
+            if errors_info:
+                raise TriggerException(422, errors_info)
             return new_items
         except HTTPException as e:
             raise e
@@ -130,20 +116,21 @@ class DocumentMutation:
         db = info.context.db
         try:
             obj = DocumentModel.objects(db)
-            old_data = await obj.get_multiple(document_ids)
-            if not old_data:
-                raise HTTPException(404, f"<{document_ids}> records not found in documents")
             kwargs = {
                 "model_data": {},
                 "signal_data": {
                     "jwt": info.context.jwt,
                     "new_data": {},
-                    "old_data": old_data,
+                    "old_data": {},
                     "well_known_urls": {"zeauth": AC.ZEAUTH_BASE_URL, "self": str(info.context.request.base_url)}
                 }
             }
-            result = await obj.delete_multiple(document_ids, **kwargs)
+            deleted_ids = await obj.delete_multiple(document_ids, **kwargs)
+            if deleted_ids is not None and not deleted_ids:
+                raise HTTPException(404, f"<{document_ids}> records not found in documents")
             return True
+        except HTTPException as e:
+            raise e
         except Exception as e:
             log.debug(AC.ERROR_TEMPLATE.format("delete_multiple_documents", type(e), str(e)))
             raise HTTPException(500, f"failed deleting documents_ids <{document_ids}>")
@@ -5,6 +5,7 @@ from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
 from business.types import SummaryTaskType, CreateSummaryTaskInput, UpdateSummaryTaskInput
 from business.db_models.summary_tasks_model import SummaryTaskModel, SummaryTasksAccess
+from core.custom_exceptions import TriggerException
 from core.constants import AppConstants as AC
 from core.depends import GraphQLContext
 from core.auth import Protect
@@ -42,20 +43,19 @@ class SummaryTaskMutation:
         db = info.context.db
         try:
             obj = SummaryTaskModel.objects(db)
-            data = await obj.get(id=summary_task_id)
-            if not data:
-                raise HTTPException(404, f"<{summary_task_id}> record not found in summary_tasks")
             new_data = input.to_dict(exclude_null=True)
             kwargs = {
                 "model_data": new_data,
                 "signal_data": {
                     "jwt": info.context.jwt,
                     "new_data": new_data,
-                    "old_data": data.to_dict() if data else {},
+                    "old_data": {},
                     "well_known_urls": {"zeauth": AC.ZEAUTH_BASE_URL, "self": str(info.context.request.base_url)}
                 }
             }
             result = await obj.update(summary_task_id, **kwargs)
+            if not result:
+                raise HTTPException(404, f"<{summary_task_id}> record not found in summary_tasks")
             return result
         except HTTPException as e:
             raise e
@@ -92,30 +92,16 @@ class SummaryTaskMutation:
     async def upsert_multiple_summary_tasks(self, inputs: List[CreateSummaryTaskInput], info: strawberry.Info[GraphQLContext]) -> List[SummaryTaskType]:
         db = info.context.db
         try:
-            new_items, errors_info = [], []
-            for summary_task_index, summary_task in enumerate(inputs):
-                try:
-                    obj = SummaryTaskModel.objects(db)
-                    new_data = summary_task.to_dict(exclude_null=True)
-                    data = await obj.get(id=new_data.get('id'))
-                    kwargs = {
-                        "model_data": new_data,
-                        "signal_data": {
-                            "jwt": info.context.jwt,
-                            "new_data": new_data,
-                            "old_data": {},
-                            "well_known_urls": {"zeauth": AC.ZEAUTH_BASE_URL, "self": str(info.context.request.base_url)}
-                        }
-                    }
-                    if data:
-                        kwargs['signal_data']['old_data'] = data.to_dict() if data else {}
-                        await obj.update(obj_id=new_data['id'], **kwargs)
-                        new_items.append(data)
-                    else:
-                        new_summary_task = await obj.create(**kwargs)
-                        new_items.append(new_summary_task)
-                except HTTPException as e:
-                    errors_info.append({"index": summary_task_index, "errors": e.detail})
+            obj = SummaryTaskModel.objects(db)
+            kwargs = {
+                "signal_data": {
+                    "jwt": info.context.jwt,
+                    "well_known_urls": {"zeauth": AC.ZEAUTH_BASE_URL, "self": str(info.context.request.base_url)}
+                }
+            }
+            new_items, errors_info = await obj.upsert_multiple([summary_task.to_dict(exclude_null=True) for summary_task in inputs], **kwargs)
+            if errors_info:
+                raise TriggerException(422, errors_info)
             return new_items
         except HTTPException as e:
             raise e
@@ -130,20 +116,21 @@ class SummaryTaskMutation:
         db = info.context.db
         try:
             obj = SummaryTaskModel.objects(db)
-            old_data = await obj.get_multiple(summary_task_ids)
-            if not old_data:
-                raise HTTPException(404, f"<{summary_task_ids}> records not found in summary_tasks")
             kwargs = {
                 "model_data": {},
                 "signal_data": {
                     "jwt": info.context.jwt,
                     "new_data": {},
-                    "old_data": old_data,
+                    "old_data": {},
                     "well_known_urls": {"zeauth": AC.ZEAUTH_BASE_URL, "self": str(info.context.request.base_url)}
                 }
             }
-            result = await obj.delete_multiple(summary_task_ids, **kwargs)
+            deleted_ids = await obj.delete_multiple(summary_task_ids, **kwargs)
+            if deleted_ids is not None and not deleted_ids:
+                raise HTTPException(404, f"<{summary_task_ids}> records not found in summary_tasks")
             return True
+        except HTTPException as e:
+            raise e
         except Exception as e:
             log.debug(AC.ERROR_TEMPLATE.format("delete_multiple_summary_tasks", type(e), str(e)))
             raise HTTPException(500, f"failed deleting summary_tasks_ids <{summary_task_ids}>")
@@ -1,11 +1,15 @@
+from typing import Optional
 import strawberry
 from strawberry.permission import PermissionExtension
 from fastapi import HTTPException
-from business.types import DocumentType
+from business.types import DocumentType, DocumentFilter
 from business.db_models.documents_model import DocumentModel, DocumentsAccess
 from core.constants import AppConstants as AC
 from core.depends import GraphQLContext
 from core.auth import Protect
+from core.pagination import Connection
+from core.filters import compile_filter
+from core.selection import selected_columns
 from core import log
 
 @strawberry.type
@@ -14,7 +18,7 @@ class DocumentQuery:
     async def get_document(self, id: strawberry.ID, info: strawberry.Info[GraphQLContext]) -> DocumentType:
         db = info.context.db
         try:
-            obj = DocumentModel.objects(db)
+            obj = DocumentModel.objects(db).only(*selected_columns(info, DocumentModel))
             result = await obj.get(id=id)
             return result
         except Exception as e:
@@ -22,12 +26,16 @@ class DocumentQuery:
             raise HTTPException(500, f"failed to fetch document with id <{id}>")
 
     @strawberry.field(extensions=[PermissionExtension(permissions=[Protect(DocumentsAccess.list_roles())])])
-    async def list_documents(self, info: strawberry.Info[GraphQLContext]) -> list[DocumentType]:
+    async def list_documents(self, info: strawberry.Info[GraphQLContext], where: Optional[DocumentFilter] = None, first: int = 10, after: Optional[str] = None) -> Connection[DocumentType]:
         db = info.context.db
         try:
-            obj = DocumentModel.objects(db)
-            result = await obj.all()
-            return result
+            obj = DocumentModel.objects(db)\
+                .where(compile_filter(DocumentModel, where))\
+                .only(*selected_columns(info, DocumentModel, path=("edges", "node")))
+            rows, has_next_page = await obj.paginate(first=min(first, AC.MAX_PAGE_SIZE), after=after)
+            return Connection.from_rows(rows, has_next_page, count=obj.detached_count)
+        except HTTPException as e:
+            raise e
         except Exception as e:
             log.debug(AC.ERROR_TEMPLATE.format(f"list_documents", type(e), str(e)))
             raise HTTPException(500, f"failed to fetch documents")
\ No newline at end of file
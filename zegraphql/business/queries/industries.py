@@ -1,11 +1,15 @@
+from typing import Optional
 import strawberry
 from strawberry.permission import PermissionExtension
 from fastapi import HTTPException
-from business.types import IndustryType
+from business.types import IndustryType, IndustryFilter
 from business.db_models.industries_model import IndustryModel, IndustriesAccess
 from core.constants import AppConstants as AC
 from core.depends import GraphQLContext
 from core.auth import Protect
+from core.pagination import Connection
+from core.filters import compile_filter
+from core.selection import selected_columns
 from core import log
 
 @strawberry.type
@@ -14,7 +18,7 @@ class IndustryQuery:
     async def get_industry(self, id: strawberry.ID, info: strawberry.Info[GraphQLContext]) -> IndustryType:
         db = info.context.db
         try:
-            obj = IndustryModel.objects(db)
+            obj = IndustryModel.objects(db).only(*selected_columns(info, IndustryModel))
             result = await obj.get(id=id)
             return result
         except Exception as e:
@@ -22,12 +26,16 @@ class IndustryQuery:
             raise HTTPException(500, f"failed to fetch industry with id <{id}>")
 
     @strawberry.field(extensions=[PermissionExtension(permissions=[Protect(IndustriesAccess.list_roles())])])
-    async def list_industries(self, info: strawberry.Info[GraphQLContext]) -> list[IndustryType]:
+    async def list_industries(self, info: strawberry.Info[GraphQLContext], where: Optional[IndustryFilter] = None, first: int = 10, after: Optional[str] = None) -> Connection[IndustryType]:
         db = info.context.db
         try:
-            obj = IndustryModel.objects(db)
-            result = await obj.all()
-            return result
+            obj = IndustryModel.objects(db)\
+                .where(compile_filter(IndustryModel, where))\
+                .only(*selected_columns(info, IndustryModel, path=("edges", "node")))
+            rows, has_next_page = await obj.paginate(first=min(first, AC.MAX_PAGE_SIZE), after=after)
+            return Connection.from_rows(rows, has_next_page, count=obj.detached_count)
+        except HTTPException as e:
+            raise e
         except Exception as e:
             log.debug(AC.ERROR_TEMPLATE.format(f"list_industries", type(e), str(e)))
             raise HTTPException(500, f"failed to fetch industries")
\ No newline at end of file
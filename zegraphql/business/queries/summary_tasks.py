@@ -1,11 +1,15 @@
+from typing import Optional
 import strawberry
 from strawberry.permission import PermissionExtension
 from fastapi import HTTPException
-from business.types import SummaryTaskType
+from business.types import SummaryTaskType, SummaryTaskFilter
 from business.db_models.summary_tasks_model import SummaryTaskModel, SummaryTasksAccess
 from core.constants import AppConstants as AC
 from core.depends import GraphQLContext
 from core.auth import Protect
+from core.pagination import Connection
+from core.filters import compile_filter
+from core.selection import selected_columns
 from core import log
 
 @strawberry.type
@@ -14,7 +18,7 @@ class SummaryTaskQuery:
     async def get_summary_task(self, id: strawberry.ID, info: strawberry.Info[GraphQLContext]) -> SummaryTaskType:
         db = info.context.db
         try:
-            obj = SummaryTaskModel.objects(db)
+            obj = SummaryTaskModel.objects(db).only(*selected_columns(info, SummaryTaskModel))
             result = await obj.get(id=id)
             return result
         except Exception as e:
@@ -22,12 +26,16 @@ class SummaryTaskQuery:
             raise HTTPException(500, f"failed to fetch summary_task with id <{id}>")
 
     @strawberry.field(extensions=[PermissionExtension(permissions=[Protect(SummaryTasksAccess.list_roles())])])
-    async def list_summary_tasks(self, info: strawberry.Info[GraphQLContext]) -> list[SummaryTaskType]:
+    async def list_summary_tasks(self, info: strawberry.Info[GraphQLContext], where: Optional[SummaryTaskFilter] = None, first: int = 10, after: Optional[str] = None) -> Connection[SummaryTaskType]:
         db = info.context.db
         try:
-            obj = SummaryTaskModel.objects(db)
-            result = await obj.all()
-            return result
+            obj = SummaryTaskModel.objects(db)\
+                .where(compile_filter(SummaryTaskModel, where))\
+                .only(*selected_columns(info, SummaryTaskModel, path=("edges", "node")))
+            rows, has_next_page = await obj.paginate(first=min(first, AC.MAX_PAGE_SIZE), after=after)
+            return Connection.from_rows(rows, has_next_page, count=obj.detached_count)
+        except HTTPException as e:
+            raise e
         except Exception as e:
             log.debug(AC.ERROR_TEMPLATE.format(f"list_summary_tasks", type(e), str(e)))
             raise HTTPException(500, f"failed to fetch summary_tasks")
\ No newline at end of file
@@ -3,6 +3,10 @@ from typing import Optional, List
 import strawberry
 import enum
 
+from business.db_models.documents_model import DocumentModel
+from business.db_models.industries_model import IndustryModel
+from core.filters import IDFilter, StringFilter, EnumFilter, DateFilter, DateTimeFilter, StringArrayFilter
+
 
 
 class BaseType:
@@ -38,6 +42,14 @@ class DocumentStatusEnum(str, enum.Enum):
     update = "update"
     delete = "delete"
 
+@strawberry.input
+class DocumentCategoryFilter(EnumFilter[DocumentCategoryEnum]):
+    pass
+
+@strawberry.input
+class DocumentStatusFilter(EnumFilter[DocumentStatusEnum]):
+    pass
+
 @strawberry.type
 class DocumentType(BaseType):
     id: Optional[strawberry.ID] = None
@@ -51,12 +63,17 @@ class DocumentType(BaseType):
     release_date: datetime.date
     expiry_date: Optional[datetime.date] = None
     industry_document: Optional[strawberry.ID] = None
-    industry_document__details: Optional["IndustryType"] = None
     category: DocumentCategoryEnum
     tags: Optional[str] = None
     original_pdf: strawberry.ID
     status: Optional[DocumentStatusEnum] = None
 
+    @strawberry.field
+    async def industry_document__details(self, info: strawberry.Info) -> Optional["IndustryType"]:
+        if not self.industry_document:
+            return None
+        return await info.context.loaders.by_column(IndustryModel, "id").load(self.industry_document)
+
 @strawberry.input
 class CreateDocumentInput(BaseType):
     id: Optional[strawberry.ID] = None
@@ -82,6 +99,26 @@ class UpdateDocumentInput(BaseType):
     original_pdf: Optional[strawberry.ID] = None
     status: Optional[DocumentStatusEnum] = None
 
+@strawberry.input
+class DocumentFilter:
+    id: Optional[IDFilter] = None
+    created_on: Optional[DateTimeFilter] = None
+    updated_on: Optional[DateTimeFilter] = None
+    created_by: Optional[IDFilter] = None
+    updated_by: Optional[IDFilter] = None
+    name: Optional[StringFilter] = None
+    report_source: Optional[StringFilter] = None
+    release_date: Optional[DateFilter] = None
+    expiry_date: Optional[DateFilter] = None
+    industry_document: Optional[IDFilter] = None
+    category: Optional[DocumentCategoryFilter] = None
+    tags: Optional[StringFilter] = None
+    original_pdf: Optional[IDFilter] = None
+    status: Optional[DocumentStatusFilter] = None
+    and_: Optional[List["DocumentFilter"]] = strawberry.field(name="and", default=None)
+    or_: Optional[List["DocumentFilter"]] = strawberry.field(name="or", default=None)
+    not_: Optional["DocumentFilter"] = strawberry.field(name="not", default=None)
+
 @strawberry.type
 class IndustryType(BaseType):
     id: Optional[strawberry.ID] = None
@@ -90,9 +127,12 @@ class IndustryType(BaseType):
     created_by: Optional[strawberry.ID] = None
     updated_by: Optional[strawberry.ID] = None
     tenant_id: Optional[strawberry.ID]  = None
-    industry_document: Optional[list["DocumentType"]] = None
     industry_name: Optional[str] = None
 
+    @strawberry.field
+    async def industry_document(self, info: strawberry.Info) -> Optional[list["DocumentType"]]:
+        return await info.context.loaders.by_column(DocumentModel, "industry_document", many=True).load(self.id)
+
 @strawberry.input
 class CreateIndustryInput(BaseType):
     id: Optional[strawberry.ID] = None
@@ -102,6 +142,18 @@ class CreateIndustryInput(BaseType):
 class UpdateIndustryInput(BaseType):
     industry_name: Optional[str] = None
 
+@strawberry.input
+class IndustryFilter:
+    id: Optional[IDFilter] = None
+    created_on: Optional[DateTimeFilter] = None
+    updated_on: Optional[DateTimeFilter] = None
+    created_by: Optional[IDFilter] = None
+    updated_by: Optional[IDFilter] = None
+    industry_name: Optional[StringFilter] = None
+    and_: Optional[List["IndustryFilter"]] = strawberry.field(name="and", default=None)
+    or_: Optional[List["IndustryFilter"]] = strawberry.field(name="or", default=None)
+    not_: Optional["IndustryFilter"] = strawberry.field(name="not", default=None)
+
 @strawberry.enum
 class SummaryTaskStatusEnum(str, enum.Enum):
     new = "new"
@@ -109,6 +161,10 @@ class SummaryTaskStatusEnum(str, enum.Enum):
     completed = "completed"
     failed = "failed"
 
+@strawberry.input
+class SummaryTaskStatusFilter(EnumFilter[SummaryTaskStatusEnum]):
+    pass
+
 @strawberry.type
 class SummaryTaskType(BaseType):
     id: Optional[strawberry.ID] = None
@@ -162,4 +218,27 @@ class UpdateSummaryTaskInput(BaseType):
     expiry_date: Optional[datetime.date] = None
     html: Optional[str] = None
     pdf: Optional[strawberry.ID] = None
-    name: Optional[str] = None
\ No newline at end of file
+    name: Optional[str] = None
+
+@strawberry.input
+class SummaryTaskFilter:
+    id: Optional[IDFilter] = None
+    created_on: Optional[DateTimeFilter] = None
+    updated_on: Optional[DateTimeFilter] = None
+    created_by: Optional[IDFilter] = None
+    updated_by: Optional[IDFilter] = None
+    status: Optional[SummaryTaskStatusFilter] = None
+    questions: Optional[StringArrayFilter] = None
+    min_max: Optional[StringFilter] = None
+    word_count: Optional[StringFilter] = None
+    source: Optional[StringFilter] = None
+    industry: Optional[StringArrayFilter] = None
+    category: Optional[StringArrayFilter] = None
+    tags: Optional[StringArrayFilter] = None
+    release_date: Optional[DateFilter] = None
+    expiry_date: Optional[DateFilter] = None
+    pdf: Optional[IDFilter] = None
+    name: Optional[StringFilter] = None
+    and_: Optional[List["SummaryTaskFilter"]] = strawberry.field(name="and", default=None)
+    or_: Optional[List["SummaryTaskFilter"]] = strawberry.field(name="or", default=None)
+    not_: Optional["SummaryTaskFilter"] = strawberry.field(name="not", default=None)
\ No newline at end of file
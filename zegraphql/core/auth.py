@@ -1,40 +1,125 @@
 
+import time
+import asyncio
 from typing import Any
-from httpx import AsyncClient
+import jwt
 from fastapi import HTTPException, Request
 from strawberry.types import Info
 from strawberry.permission import BasePermission
 
+from .cache import TTLCache
 from .custom_exceptions import AuthorizationError
 from .constants import AppConstants as AC
 from .depends import GraphQLContext, set_current_user_data_contextvar
+from .http_client import get_http_client
+from .jwks import jwks_client
 from .logger import log
 
+# (token, required roles) -> roles allowed by zeauth
+token_cache = TTLCache(maxsize=AC.AUTH_CACHE_SIZE, ttl=AC.AUTH_CACHE_TTL)
+
+
+def token_ttl(token: str) -> float:
+    """
+    Return the seconds left before the token expires, None when it has no expiry.
+    """
+    exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    return None if exp is None else exp - time.time()
+
+
+def claim_roles(claims: dict) -> list[str]:
+    """
+    Return the roles of the AUTH_ROLES_CLAIM claim, a single role may be given as a string.
+    """
+    roles = claims.get(AC.AUTH_ROLES_CLAIM) or []
+    return [roles] if isinstance(roles, str) else list(roles)
+
+
+class RequestAuth:
+    """
+    Identity and role set of a request token, resolved once per GraphQL operation
+    and shared by every Protect check of that operation.
+    """
+
+    def __init__(self, token: str):
+        self.token = token
+        self.is_valid = False
+        self.roles: frozenset = frozenset()
+        self.claims: dict = {}
+        self._resolving: asyncio.Future = None
+
+    async def resolve(self) -> None:
+        """
+        Validate the token against every role known to Protect, concurrent callers share the same validation.
+        """
+        if self._resolving is None:
+            self._resolving = asyncio.ensure_future(self._resolve())
+        await self._resolving
+
+    async def _resolve(self) -> None:
+        if AC.AUTH_MODE == "local":
+            try:
+                self.claims = await jwks_client.verify(self.token)
+            except jwt.InvalidTokenError as e:
+                log.debug(f"Invalid token: {e}")
+                return
+            self.is_valid = True
+            self.roles = frozenset(claim_roles(self.claims))
+            return
+
+        protect = Protect(sorted(Protect.known_roles))
+        self.is_valid, roles = await protect.validate_token(self.token)
+        if self.is_valid:
+            self.claims = jwt.decode(self.token, options={"verify_signature": False})
+            self.roles = frozenset(roles)
+
 
 class Protect(BasePermission):
     message = "User is not authorized for this operation"
+    known_roles: set[str] = set()  # roles required by any Protect instance
 
     def __init__(self, required_roles: list[str]):
         self.required_roles = required_roles
+        self.required_role_set = frozenset(required_roles)
+        Protect.known_roles.update(required_roles)
 
     async def has_permission(self, source: Any, info: Info[GraphQLContext], **kwargs) -> bool:
+        if info.context.auth is None:
+            info.context.auth = RequestAuth(info.context.jwt)
+        await self.authorize(info.context.auth)
+        return True
+
+    async def as_dependency(self, request: Request) -> RequestAuth:
+        """
+        FastAPI dependency applying the same checks to plain HTTP endpoints, e.g. Depends(Protect(roles).as_dependency)
+        """
         try:
-            token = info.context.jwt
+            token = self._extract_token_from_headers(request.headers)
+        except AuthorizationError as e:
+            log.debug(f"Authorization Error: {e}")
+            raise HTTPException(status_code=403, detail=str(e))
+        request_auth = RequestAuth(token)
+        await self.authorize(request_auth)
+        return request_auth
 
+    async def authorize(self, request_auth: RequestAuth) -> None:
+        """
+        Check the token of the request carries one of the required roles and set the current user context variables.
+        """
+        try:
             try:
-                is_valid, current_user_roles = await self.validate_token(token)
+                await request_auth.resolve()
             except Exception as e:
                 raise AuthorizationError("Token validation failed")
 
-            if not is_valid:
+            if not request_auth.is_valid:
                 raise AuthorizationError("Invalid token")
 
-            if not any(role in current_user_roles for role in self.required_roles):
+            current_user_roles = request_auth.roles & self.required_role_set
+            if not current_user_roles:
                 raise AuthorizationError("User not authorized to perform this action")
             
-            set_current_user_data_contextvar(token, current_user_roles)
-
-            return True
+            set_current_user_data_contextvar(request_auth.token, list(current_user_roles), claims=request_auth.claims)
         except AuthorizationError as e:
             log.debug(f"Authorization Error: {e}")
             raise HTTPException(status_code=403, detail=str(e))
@@ -55,16 +140,35 @@ class Protect(BasePermission):
 
     async def validate_token(self, token: str) -> tuple[bool, list[str]]:
         try:
-            log.debug(f"{token=}")
-            async with AsyncClient() as client:
-                request_data = {"roles": self.required_roles}
-                response = await client.post(f"{AC.ZEAUTH_BASE_URL}/oauth/auth?token={token}", json=request_data)
-                if response.status_code != 200:
-                    return False, []
-                data: dict = response.json()
-                user_roles = data.get("allowed_roles", [])
+            if AC.AUTH_MODE == "local":
+                return await self.validate_token_locally(token)
+
+            cache_key = (token, frozenset(self.required_roles))
+            user_roles = token_cache.get(cache_key)
+            if user_roles is not None:
                 return True, user_roles
+
+            client = get_http_client()
+            request_data = {"roles": self.required_roles}
+            response = await client.post(f"{AC.ZEAUTH_BASE_URL}/oauth/auth?token={token}", json=request_data)
+            if response.status_code != 200:
+                return False, []
+            data: dict = response.json()
+            user_roles = data.get("allowed_roles", [])
+            token_cache.set(cache_key, user_roles, ttl=token_ttl(token))
+            return True, user_roles
         except Exception as e:
             log.debug(AC.ERROR_TEMPLATE.format("validate_token", type(e), str(e)))
             log.error(f"Toekn validation failed: {e}")
             raise AuthorizationError("Token validation failed")
+
+    async def validate_token_locally(self, token: str) -> tuple[bool, list[str]]:
+        """
+        Verify the token signature and expiry against zeauth's cached signing keys and read the roles from its claims.
+        """
+        try:
+            claims = await jwks_client.verify(token)
+        except jwt.InvalidTokenError as e:
+            log.debug(f"Invalid token: {e}")
+            return False, []
+        return True, [role for role in claim_roles(claims) if role in self.required_roles]
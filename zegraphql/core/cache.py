@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a time to live.
+    Meant to be used from the event loop thread only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Return the cached value of key, or default when it is missing or expired.
+        """
+        item = self._data.get(key)
+        if item is None or item[1] <= time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def peek(self, key, default=None):
+        """
+        Return the cached value of key like get, without counting a hit or miss nor refreshing its LRU position.
+        """
+        item = self._data.get(key)
+        if item is None or item[1] <= time.monotonic():
+            return default
+        return item[0]
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Cache value under key, ttl may only shorten the cache-wide time to live.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -12,23 +12,88 @@ class AppConstants:
     ZENOTIFY_BASE_URL: str = WELL_KNOWN_URLS.get('zekoder-zenotify-local-address')
     INTERNAL_IP_RANGES: str = os.getenv("INTERNAL_IP_RANGES") 
 
+    # zeauth client config
+    ZEAUTH_TIMEOUT: float = float(os.environ.get('ZEAUTH_TIMEOUT', 10))
+    ZEAUTH_MAX_CONNECTIONS: int = int(os.environ.get('ZEAUTH_MAX_CONNECTIONS', 100))
+    ZEAUTH_MAX_KEEPALIVE: int = int(os.environ.get('ZEAUTH_MAX_KEEPALIVE', 20))
+    AUTH_CACHE_SIZE: int = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+    AUTH_CACHE_TTL: float = float(os.environ.get('AUTH_CACHE_TTL', 60)) #seconds
+
+    # token verification, "remote" asks zeauth on every check, "local" verifies signatures with zeauth's JWKS
+    AUTH_MODE: str = os.environ.get('AUTH_MODE', 'remote')
+    AUTH_JWKS_URL: str = os.environ.get('AUTH_JWKS_URL', f'{ZEAUTH_BASE_URL}/.well-known/jwks.json')
+    AUTH_JWKS_REFRESH_INTERVAL: float = float(os.environ.get('AUTH_JWKS_REFRESH_INTERVAL', 300)) #5 minutes
+    AUTH_JWT_ALGORITHMS: List[str] = os.environ.get('AUTH_JWT_ALGORITHMS', 'RS256').split(',')
+    AUTH_JWT_AUDIENCE: str = os.environ.get('AUTH_JWT_AUDIENCE')
+    AUTH_ROLES_CLAIM: str = os.environ.get('AUTH_ROLES_CLAIM', 'roles')
+
     # database credentials
     DB_USERNAME: str = os.environ.get('DB_USERNAME', 'demo')
     DB_PASSWORD: str = os.environ.get('DB_PASSWORD', 'demo29517')
     DB_NAME: str = os.environ.get('DB_NAME', 'zekoder')
     DB_HOST: str = os.environ.get('DB_HOST', '127.0.0.1')
     DB_PORT: str = os.environ.get('DB_PORT', '26257')
+    DB_REPLICA_HOSTS: List[str] = [host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
 
     # engine client config
-    DB_POOL_SIZE: str = os.environ.get('DB_POOL_SIZE', 10)
-    DB_MAX_OVERFLOW: str = os.environ.get('DB_POOL_SIZE', 5)
-    DB_POOL_TIMEOUT: str = os.environ.get('DB_POOL_SIZE', 30) #30 seconds
-    DB_POOL_RECYCLE: str = os.environ.get('DB_POOL_SIZE', 3600) #1 hour
+    DB_POOL_SIZE: int = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW: int = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    DB_POOL_TIMEOUT: int = int(os.environ.get('DB_POOL_TIMEOUT', 30)) #30 seconds
+    DB_POOL_RECYCLE: int = int(os.environ.get('DB_POOL_RECYCLE', 3600)) #1 hour
+    DB_TOTAL_CONNECTIONS: int = int(os.environ.get('DB_TOTAL_CONNECTIONS', 0)) #connection budget shared by all workers, 0 to use DB_POOL_SIZE/DB_MAX_OVERFLOW per worker
+    WORKERS: int = int(os.environ.get('UVICORN_WORKERS', os.environ.get('WORKERS', 1)))
+    DB_ECHO: bool = os.environ.get('DB_ECHO', 'false').lower() in ('1', 'true', 'yes') #log every SQL statement
     DB_SYNC_DRIVER: str = os.environ.get('SYNC_DB_DRIVER', 'postgresql+psycopg2')
     SYNC_DB_QUERY_PARAMS: str = os.environ.get('SYNC_DB_QUERY_PARAMS', 'sslmode=disable')
     DB_DRIVER: str = os.environ.get('DB_DRIVER', 'postgresql+asyncpg')
     DB_QUERY_PARAMS: str = os.environ.get('DB_QUERY_PARAMS', 'ssl=disable')
 
+    # pagination
+    MAX_PAGE_SIZE: int = int(os.environ.get('MAX_PAGE_SIZE', 100))
+    EXPORT_BATCH_SIZE: int = int(os.environ.get('EXPORT_BATCH_SIZE', 1000)) #rows fetched per server-side cursor round trip
+
+    # query cost analysis, cost ~ number of records an operation can fetch
+    MAX_QUERY_COST: float = float(os.environ.get('MAX_QUERY_COST', 10000))
+    COST_DEFAULT_LIST_SIZE: int = int(os.environ.get('COST_DEFAULT_LIST_SIZE', 20)) #assumed size of lists without first/limit
+    COST_LIST_SIZES: dict = json.loads(os.environ.get('COST_LIST_SIZES', '{}')) #e.g. {"IndustryType.industryDocument": 50}
+    COST_BUDGET_BURST: float = float(os.environ.get('COST_BUDGET_BURST', 20000)) #per tenant and worker
+    COST_BUDGET_RATE: float = float(os.environ.get('COST_BUDGET_RATE', 2000)) #cost units refilled per second
+    COST_BUDGET_TENANTS: int = int(os.environ.get('COST_BUDGET_TENANTS', 10000))
+
+    # metrics
+    SQL_FINGERPRINT_LIMIT: int = int(os.environ.get('SQL_FINGERPRINT_LIMIT', 500)) #distinct statement shapes labelled in metrics
+    METRICS_OPERATION_LIMIT: int = int(os.environ.get('METRICS_OPERATION_LIMIT', 200)) #distinct client operation names labelled in metrics
+
+    # slow query log
+    SLOW_QUERY_THRESHOLD: float = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.5)) #seconds
+    SLOW_QUERY_EXPLAIN_RATE: float = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', 0)) #share of slow SELECTs re-run with EXPLAIN ANALYZE
+    SLOW_QUERY_BUFFER_SIZE: int = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', 100))
+
+    # logging
+    LOG_LEVEL: str = os.environ.get('LOG_LEVEL', 'INFO').upper() #DEBUG, INFO, WARNING, ERROR or CRITICAL
+    LOG_FORMAT: str = os.environ.get('LOG_FORMAT', 'text') #text or json
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1)) #share of debug records kept
+
+    # tracing
+    TRACING_EXPORTER: str = os.environ.get('TRACING_EXPORTER', 'none') #otlp, file or none
+    TRACING_FILE: str = os.environ.get('TRACING_FILE', 'traces.jsonl')
+    TRACING_SERVICE_NAME: str = os.environ.get('TRACING_SERVICE_NAME', 'karari')
+
+    # automatic persisted queries and parsed/validated document caches
+    APQ_CACHE_SIZE: int = int(os.environ.get('APQ_CACHE_SIZE', 1000))
+    APQ_TTL: float = float(os.environ.get('APQ_TTL', 86400)) #1 day
+    DOCUMENT_CACHE_SIZE: int = int(os.environ.get('DOCUMENT_CACHE_SIZE', 256))
+
+    # entity cache in front of Manager.get, off unless a redis URL is given,
+    # the memory backend is per process: other workers serve rows up to ENTITY_CACHE_TTL old after a write
+    ENTITY_CACHE_URL: str = os.environ.get('ENTITY_CACHE_URL')
+    ENTITY_CACHE_BACKEND: str = os.environ.get('ENTITY_CACHE_BACKEND', 'redis' if ENTITY_CACHE_URL else 'none') #redis, memory or none
+    ENTITY_CACHE_SIZE: int = int(os.environ.get('ENTITY_CACHE_SIZE', 10000))
+    ENTITY_CACHE_TTL: float = float(os.environ.get('ENTITY_CACHE_TTL', 60)) #seconds
+
+    # maximum number of per-record triggers running concurrently, above 1 triggers must not query through the request session
+    TRIGGER_CONCURRENCY: int = int(os.environ.get('TRIGGER_CONCURRENCY', 1))
+
     # Error template format
     ERROR_TEMPLATE = "Error inside {0}:  An exception of type {1} occurred. error: {2}"
 
@@ -0,0 +1,159 @@
+import time
+
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    get_named_type,
+    get_nullable_type,
+    get_operation_ast,
+)
+from graphql.utilities import value_from_ast
+from strawberry.extensions import SchemaExtension
+
+from .auth import RequestAuth
+from .cache import TTLCache
+from .constants import AppConstants as AC
+from .logger import log
+from .metrics import Counter
+
+rejected_operations = Counter("graphql_rejected_operations_total", "Operations rejected by the cost analysis", ("reason",))
+
+PAGE_SIZE_ARGUMENTS = ("first", "limit")
+
+
+class TokenBucket:
+    """
+    Cost budget refilled at `rate` units per second up to `capacity`.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def consume(self, amount: float) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if amount > self.tokens:
+            return False
+        self.tokens -= amount
+        return True
+
+
+# tenant id -> TokenBucket, idle buckets expire once they would be full again
+tenant_budgets = TTLCache(maxsize=AC.COST_BUDGET_TENANTS, ttl=AC.COST_BUDGET_BURST / max(AC.COST_BUDGET_RATE, 1))
+
+
+class QueryCost(SchemaExtension):
+    """
+    Estimate how many records an operation can fetch before executing it.
+    Every object field costs 1, multiplied by the page size (first/limit argument) of the connection it
+    belongs to, or by the known cardinality of list fields without a page size (COST_LIST_SIZES).
+    Operations above MAX_QUERY_COST are rejected, the others are charged to the tenant's token bucket.
+    Buckets are kept per worker process.
+    """
+
+    async def on_execute(self):
+        execution_context = self.execution_context
+        document = execution_context.graphql_document
+        operation = get_operation_ast(document, execution_context.operation_name) if document else None
+        if operation is not None:
+            schema = execution_context.schema._schema
+            root_type = schema.get_root_type(operation.operation)
+            fragments = {
+                definition.name.value: definition
+                for definition in document.definitions
+                if definition.kind == "fragment_definition"
+            }
+            cost = self.selection_cost(operation.selection_set, root_type, fragments, execution_context.variables or {}, None)
+            await self.charge(cost)
+        yield
+
+    async def charge(self, cost: float) -> None:
+        if cost > AC.MAX_QUERY_COST:
+            rejected_operations.inc(reason="max_cost")
+            raise GraphQLError(
+                f"Operation cost {cost:g} exceeds the maximum of {AC.MAX_QUERY_COST:g}",
+                extensions={"code": "QUERY_TOO_COSTLY", "cost": cost},
+            )
+
+        tenant = await self.tenant()
+        bucket = tenant_budgets.get(tenant)
+        if bucket is None:
+            bucket = TokenBucket(AC.COST_BUDGET_BURST, AC.COST_BUDGET_RATE)
+        allowed = bucket.consume(cost)
+        tenant_budgets.set(tenant, bucket)
+        if not allowed:
+            rejected_operations.inc(reason="budget")
+            log.debug(f"Tenant <{tenant}> is over its query budget, operation cost {cost:g}")
+            raise GraphQLError(
+                "Query budget exhausted, retry later",
+                extensions={"code": "RATE_LIMITED", "cost": cost, "retry_after": (cost - bucket.tokens) / bucket.rate},
+            )
+
+    async def tenant(self) -> str:
+        """
+        Tenant of the verified request token, the resolved identity is shared with the Protect checks.
+        """
+        context = self.execution_context.context
+        if not context.jwt:
+            return None
+        if context.auth is None:
+            context.auth = RequestAuth(context.jwt)
+        try:
+            await context.auth.resolve()
+        except Exception as e:
+            log.debug(AC.ERROR_TEMPLATE.format("QueryCost.tenant", type(e), str(e)))
+            return None
+        return context.auth.claims.get("tenant_id") if context.auth.is_valid else None
+
+    def selection_cost(self, selection_set, parent_type, fragments: dict, variables: dict, page_size) -> float:
+        """
+        Cost of a selection set of parent_type, page_size is the pending page size of the enclosing connection.
+        """
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = fragments.get(selection.name.value)
+                if fragment is not None:
+                    fragment_type = self.execution_context.schema._schema.get_type(fragment.type_condition.name.value)
+                    cost += self.selection_cost(fragment.selection_set, fragment_type, fragments, variables, page_size)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.execution_context.schema._schema.get_type(selection.type_condition.name.value)
+                cost += self.selection_cost(selection.selection_set, fragment_type, fragments, variables, page_size)
+            elif isinstance(selection, FieldNode):
+                cost += self.field_cost(selection, parent_type, fragments, variables, page_size)
+        return cost
+
+    def field_cost(self, node: FieldNode, parent_type, fragments: dict, variables: dict, page_size) -> float:
+        if node.selection_set is None or not isinstance(parent_type, GraphQLObjectType):
+            return 0
+        field = parent_type.fields.get(node.name.value)
+        if field is None:
+            return 0
+
+        multiplier = 1
+        if isinstance(get_nullable_type(field.type), GraphQLList):
+            if page_size is None:
+                page_size = AC.COST_LIST_SIZES.get(f"{parent_type.name}.{node.name.value}", AC.COST_DEFAULT_LIST_SIZE)
+            multiplier, page_size = page_size, None
+
+        arguments = {argument.name.value: argument.value for argument in node.arguments}
+        for name in PAGE_SIZE_ARGUMENTS:
+            if name in field.args:
+                value = value_from_ast(arguments[name], field.args[name].type, variables) if name in arguments else None
+                if value is None:
+                    value = field.args[name].default_value
+                if isinstance(value, int):
+                    page_size = max(0, min(value, AC.MAX_PAGE_SIZE))  # negative sizes would offset the cost of siblings
+
+        child_type = get_named_type(field.type)
+        return multiplier * (1 + self.selection_cost(node.selection_set, child_type, fragments, variables, page_size))
@@ -1,22 +1,176 @@
+import random
+import time
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.sql import text
-from sqlalchemy import event
+from sqlalchemy import event, Select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from core.logger import log
 from core.constants import AppConstants as AC
+from core.metrics import Counter, Histogram
+from core.sql_fingerprint import fingerprint, statements
+from core.slow_queries import check_statement
 
 
 Base = declarative_base()
 
-db_url = f'{AC.DB_DRIVER}://{AC.DB_USERNAME}:{AC.DB_PASSWORD}@{AC.DB_HOST}:{AC.DB_PORT}/{AC.DB_NAME}?{AC.DB_QUERY_PARAMS}'
+def build_db_url(host: str, port: str) -> str:
+    return f'{AC.DB_DRIVER}://{AC.DB_USERNAME}:{AC.DB_PASSWORD}@{host}:{port}/{AC.DB_NAME}?{AC.DB_QUERY_PARAMS}'
 
+
+db_url = build_db_url(AC.DB_HOST, AC.DB_PORT)
+
+pool_wait_seconds = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection", ("engine",))
+pool_timeouts = Counter("db_pool_timeouts_total", "Connection checkouts that hit pool_timeout", ("engine",))
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool recording how long every checkout waited and how many timed out,
+    labelled with the engine name given as pool_logging_name.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            pool_timeouts.inc(engine=self.logging_name)
+            raise
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start, engine=self.logging_name)
+
+
+def pool_sizes() -> tuple[int, int]:
+    """
+    Return the pool size and max overflow of this process. When DB_TOTAL_CONNECTIONS is set it is split
+    between the workers, keeping the DB_POOL_SIZE/DB_MAX_OVERFLOW ratio, so that every worker together
+    never opens more connections than the budget.
+    Raise ValueError on settings no pool can satisfy, at startup rather than on the first query.
+    """
+    if AC.DB_POOL_SIZE < 1 or AC.DB_MAX_OVERFLOW < 0:
+        raise ValueError(f"DB_POOL_SIZE must be at least 1 and DB_MAX_OVERFLOW at least 0, got {AC.DB_POOL_SIZE} and {AC.DB_MAX_OVERFLOW}")
+    if not AC.DB_TOTAL_CONNECTIONS:
+        return AC.DB_POOL_SIZE, AC.DB_MAX_OVERFLOW
+    workers = max(AC.WORKERS, 1)
+    if AC.DB_TOTAL_CONNECTIONS < workers:
+        raise ValueError(f"DB_TOTAL_CONNECTIONS ({AC.DB_TOTAL_CONNECTIONS}) must be at least the number of workers ({workers}), every worker needs a connection")
+    per_worker = AC.DB_TOTAL_CONNECTIONS // workers
+    overflow = per_worker * AC.DB_MAX_OVERFLOW // (AC.DB_POOL_SIZE + AC.DB_MAX_OVERFLOW)
+    overflow = min(overflow, per_worker - 1)  # a pool_size of 0 would mean no limit
+    return per_worker - overflow, overflow
+
+
+pool_size, max_overflow = pool_sizes()
 engine_args = {
-    "pool_size": AC.DB_POOL_SIZE,
-    "max_overflow": AC.DB_MAX_OVERFLOW,
+    "poolclass": InstrumentedPool,
+    "pool_size": pool_size,
+    "max_overflow": max_overflow,
     "pool_timeout": AC.DB_POOL_TIMEOUT,
     "pool_recycle": AC.DB_POOL_RECYCLE,
 }
-engine_async = create_async_engine(db_url, echo=True, **engine_args)
-db_session: AsyncSession = sessionmaker(bind=engine_async, expire_on_commit=False, class_=AsyncSession)
+engine_async = create_async_engine(db_url, echo=AC.DB_ECHO, pool_logging_name="primary", **engine_args)
+
+
+
+def build_replica_url(replica: str) -> str:
+    """
+    Build the url of a read replica given as "host" or "host:port".
+    """
+    host, _, port = replica.partition(":")
+    return build_db_url(host, port or AC.DB_PORT)
+
+
+replica_engines = [
+    create_async_engine(build_replica_url(replica), echo=AC.DB_ECHO, pool_logging_name=f"replica-{index}", **engine_args)
+    for index, replica in enumerate(AC.DB_REPLICA_HOSTS)
+]
+engines = {"primary": engine_async, **{f"replica-{index}": engine for index, engine in enumerate(replica_engines)}}
+
+statement_seconds = Histogram("db_statement_seconds", "SQL statement latency by statement fingerprint", ("engine", "fingerprint"))
+
+
+def start_statement_timer(connection, cursor, statement, parameters, context, executemany):
+    context.statement_start = time.perf_counter()
+
+
+def record_statement_time(connection, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.statement_start
+    statement_seconds.observe(duration, engine=connection.engine.pool.logging_name, fingerprint=fingerprint(statement))
+    check_statement(connection, statement, parameters, duration)
+
+
+for engine in engines.values():
+    event.listen(engine.sync_engine, "before_cursor_execute", start_statement_timer)
+    event.listen(engine.sync_engine, "after_cursor_execute", record_statement_time)
+
+
+class AppSession(Session):
+    """
+    Sync session class behind every AsyncSession of the app, session events are registered on it once.
+    SELECT statements are routed to a read replica when replicas are configured, until the session
+    writes or is marked with info["use_primary"], after which everything sticks to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not replica_engines or self.info.get("use_primary"):
+            return engine_async.sync_engine
+        if self._flushing or not isinstance(clause, Select):
+            self.info["use_primary"] = True
+            return engine_async.sync_engine
+        if "replica" not in self.info:
+            self.info["replica"] = random.choice(replica_engines)  # one replica per session for consistent reads
+        return self.info["replica"].sync_engine
+
+
+db_session: AsyncSession = sessionmaker(bind=engine_async, expire_on_commit=False, class_=AsyncSession, sync_session_class=AppSession)
+
+
+def pool_stats() -> dict:
+    """
+    Return the connection pool usage of every engine.
+    """
+    return {
+        name: {
+            "size": engine.pool.size(),
+            "max_overflow": max_overflow,
+            "checked_in": engine.pool.checkedin(),
+            "checked_out": engine.pool.checkedout(),
+            "overflow": engine.pool.overflow(),
+            "timeouts": pool_timeouts.values.get((name,), 0),
+        }
+        for name, engine in engines.items()
+    }
+
+
+def statement_stats() -> dict:
+    """
+    Return the normalized text, execution count and total seconds of every statement fingerprint, on all engines.
+    """
+    stats = {key: {"statement": statement, "count": 0, "seconds": 0.0} for key, statement in statements.items()}
+    for (engine, key), (counts, total, count) in list(statement_seconds.values.items()):
+        if key in stats:
+            stats[key]["count"] += count
+            stats[key]["seconds"] += total
+    return stats
+
+
+async def replica_lag() -> dict:
+    """
+    Return the replay lag in seconds of every read replica, None when it cannot be measured.
+    """
+    lag = {}
+    for name, engine in engines.items():
+        if engine is engine_async:
+            continue
+        try:
+            async with engine.connect() as connection:
+                result = await connection.execute(text("SELECT extract(epoch FROM now() - pg_last_xact_replay_timestamp())"))
+                lag[name] = result.scalar()
+        except Exception as e:
+            log.error(f"Measuring the lag of {name} failed: {e}")
+            lag[name] = None
+    return lag
@@ -1,37 +1,85 @@
+import ipaddress
 import jwt
 from contextvars import ContextVar
-from fastapi import Depends, HTTPException, Request
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import text
 from strawberry.fastapi.context import BaseContext
 
-from .db_config import db_session 
-from .logger import log
-from .constants import AppConstants as AC
+from .db_config import db_session, engines, AppSession
+from .loaders import Loaders
+from .logger import log, add_context_field
+from .constants import AppConstants as AC, get_internal_ip_ranges
 
 
 user_session: ContextVar[str] = ContextVar('user_session', default=None)
 user_roles: ContextVar[list] = ContextVar('user_roles', default=[])
 tenant_id: ContextVar[list] = ContextVar('tenant_id', default=None)
+add_context_field("tenant_id", tenant_id)
+
+IDENTITY_KEY = "zekoder_identity"  # identity set on a pooled connection by a committed transaction
+PENDING_IDENTITY_KEY = "zekoder_pending_identity"  # identity set by the transaction in progress
+
+
+@event.listens_for(AppSession, "after_begin")
+def execute_after_begin_transaction(session, transaction, connection: Connection):
+    """
+    Send the current user identity to the database in one parameterized set_config call,
+    skipped when the pooled connection already carries the same identity.
+    """
+    identity = {
+        "id": str(current_user_uuid()),
+        "roles": ",".join(current_user_roles()),
+        "tenant_id": str(current_user_tenant()),
+    }
+    info = connection.info
+    current_identity = info[PENDING_IDENTITY_KEY] if PENDING_IDENTITY_KEY in info else info.get(IDENTITY_KEY)
+    if current_identity == identity:
+        return
+    connection.execute(
+        text("SELECT set_config('zekoder.id', :id, false), set_config('zekoder.roles', :roles, false), set_config('zekoder.tenant_id', :tenant_id, false)"),
+        identity,
+    )
+    info[PENDING_IDENTITY_KEY] = identity
+    log.debug('--- Database parameters has been set ----')
+
+
+def keep_connection_identity(connection: Connection):
+    """
+    The commit event fires before COMMIT is sent, a failing COMMIT is caught by drop_connection_identity
+    and forget_connection_identity, which make the next transaction set the identity again.
+    """
+    if PENDING_IDENTITY_KEY in connection.info:
+        connection.info[IDENTITY_KEY] = connection.info.pop(PENDING_IDENTITY_KEY)
+
+
+def drop_connection_identity(connection: Connection):
+    connection.info.pop(PENDING_IDENTITY_KEY, None)
+    connection.info.pop(IDENTITY_KEY, None)
+
+
+def forget_connection_identity(exception_context):
+    connection = exception_context.connection
+    if connection is not None and not connection.invalidated:
+        drop_connection_identity(connection)
+
+
+def drop_pooled_connection_identity(dbapi_connection, connection_record, reset_state):
+    connection_record.info.pop(PENDING_IDENTITY_KEY, None)
 
-async def get_db():
-    from sqlalchemy.sql import text
-    from sqlalchemy import event
-    from sqlalchemy.engine import Connection
-    def execute_after_begin_transaction(session, transaction, connection: Connection):
-        log.debug('--- Start new transaction ----')
-        connection.execute(text(f"SET zekoder.id = '{current_user_uuid()}'"))
-        connection.execute(text(f"SET zekoder.roles = '{','.join(current_user_roles())}'"))
-        connection.execute(text(f"SET zekoder.tenant_id = '{current_user_tenant()}'"))
-        log.debug('--- Database parameters has been set ----')
 
+for engine in engines.values():
+    event.listen(engine.sync_engine, "commit", keep_connection_identity)
+    event.listen(engine.sync_engine, "rollback", drop_connection_identity)
+    event.listen(engine.sync_engine, "handle_error", forget_connection_identity)
+    event.listen(engine.sync_engine.pool, "reset", drop_pooled_connection_identity)
 
+
+async def get_db():
     async with db_session() as session:
         try:
-            event.listen(
-                session.sync_session,
-                'after_begin',
-                execute_after_begin_transaction
-            )
             yield session
 
         finally:
@@ -39,11 +87,42 @@ async def get_db():
 
 
 class GraphQLContext(BaseContext):
-    def __init__(self, request: Request, db: AsyncSession):
-        self.db = db
+    def __init__(self, request: Request, db: AsyncSession = None):
+        self._db = db
         self.request = request
         self.jwt = self.extract_token()
+        self.loaders = Loaders(self)
+        self.auth = None  # core.auth.RequestAuth, resolved on the first permission check
     
+    @property
+    def db(self) -> AsyncSession:
+        """
+        Database session of the request, created on first use.
+        The session checks out a pooled connection only when it runs its first statement.
+        """
+        if self._db is None:
+            self._db = db_session(info={"bypass_cache": self.bypass_cache})
+        return self._db
+
+    @property
+    def bypass_cache(self) -> bool:
+        """
+        Consistency-critical reads skip the entity cache by sending Cache-Control: no-cache
+        """
+        return "no-cache" in self.request.headers.get("Cache-Control", "")
+
+    @property
+    def has_db(self) -> bool:
+        return self._db is not None
+
+    async def close_db(self) -> None:
+        """
+        Close the session, returning its connection to the pool.
+        """
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
     def extract_token(self) -> str:
         authorization = self.request.headers.get("Authorization", None)
         if not authorization:
@@ -52,23 +131,37 @@ class GraphQLContext(BaseContext):
             raise HTTPException(403, "Invalid Authorization format")
         return authorization.split("Bearer ")[1]
 
-async def get_context(request: Request, db: AsyncSession = Depends(get_db)) -> GraphQLContext:
-    return GraphQLContext(request, db)
+async def get_context(request: Request) -> GraphQLContext:
+    return GraphQLContext(request)
 
-def set_current_user_data_contextvar(token: str, current_user_roles: list[str]) -> None:
+def internal_only(request: Request) -> None:
+    """
+    Reject requests to internal endpoints coming from outside INTERNAL_IP_RANGES, or from everywhere when it is not set.
+    """
+    try:
+        client_ip = ipaddress.ip_address(request.client.host)
+        ip_ranges = [ipaddress.ip_network(ip_range.strip(), strict=False) for ip_range in get_internal_ip_ranges() if ip_range.strip()]
+    except ValueError as e:
+        log.debug(AC.ERROR_TEMPLATE.format("internal_only", type(e), str(e)))
+        raise HTTPException(403, "Internal endpoint")
+    if not any(client_ip in ip_range for ip_range in ip_ranges):
+        raise HTTPException(403, "Internal endpoint")
+
+def set_current_user_data_contextvar(token: str, current_user_roles: list[str], claims: dict = None) -> None:
         """
         Extracts the current user information from the authentication token and sets it in context variables.
 
         Parameters:
         - token (str): The authentication token.
         - current_user_roles (list[str]): The list of roles assigned to the current user.
+        - claims (dict): The already decoded token claims, the token is decoded when not given.
 
         Raises:
         - HTTPException: Raises HTTPException with a 403 status code and an error message if the user information
                          cannot be extracted or if there's an issue setting context variables.
         """
         try:
-            current_user = jwt.decode(token, options={"verify_signature": False})
+            current_user = claims or jwt.decode(token, options={"verify_signature": False})
             current_user_id = current_user.get("sub")
             current_user_tenant = current_user.get("tenant_id")
             if not current_user_id:
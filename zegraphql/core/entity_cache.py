@@ -0,0 +1,178 @@
+import datetime
+import decimal
+import enum
+import json
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from .cache import TTLCache
+from .constants import AppConstants as AC
+from .depends import current_user_uuid, current_user_tenant, current_user_roles
+from .logger import log
+from .metrics import Counter
+
+cache_requests = Counter("entity_cache_requests_total", "Entity cache lookups by result", ("model", "result"))
+cache_evictions = Counter("entity_cache_evictions_total", "Entity cache entries evicted to make room")
+
+MAX_SCOPES_PER_ENTITY = 32  # identities cached per record, the oldest is dropped beyond that
+
+
+class MemoryBackend:
+    """
+    In-process LRU with time to live, every worker keeps its own copy.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str, scope: str):
+        return (self._cache.get(key) or {}).get(scope)
+
+    async def set(self, key: str, scope: str, row: dict) -> None:
+        scopes = dict(self._cache.peek(key) or {})
+        scopes[scope] = row
+        while len(scopes) > MAX_SCOPES_PER_ENTITY:
+            scopes.pop(next(iter(scopes)))
+        evictions = self._cache.evictions
+        self._cache.set(key, scopes)
+        cache_evictions.inc(self._cache.evictions - evictions)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class RedisBackend:
+    """
+    Redis hash per record (one field per identity scope) shared by every worker, needs the redis package.
+    Eviction is left to the server's maxmemory policy.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("ENTITY_CACHE_BACKEND=redis needs the redis package (pip install redis)")
+        self.ttl = ttl
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str, scope: str):
+        value = await self._client.hget(key, scope)
+        return None if value is None else json.loads(value)
+
+    async def set(self, key: str, scope: str, row: dict) -> None:
+        async with self._client.pipeline(transaction=False) as pipeline:
+            pipeline.hset(key, scope, json.dumps(row))
+            pipeline.expire(key, int(self.ttl))
+            await pipeline.execute()
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    def stats(self) -> dict:
+        return {}
+
+
+def decode_value(column, value):
+    """
+    Convert a JSON value of a cached row back to the python type of its column.
+    """
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    if python_type is datetime.date:
+        return datetime.date.fromisoformat(value)
+    if python_type in (uuid.UUID, decimal.Decimal) or issubclass(python_type, enum.Enum):
+        return python_type(value)
+    return value
+
+
+class EntityCache:
+    """
+    Read-through cache of single records looked up by id.
+    Rows are cached per identity (tenant, user and roles), the same identity the database
+    row level security policies are evaluated with, and dropped from every identity on write.
+    Rows are stored as JSON values (UUID, datetime and enums as strings) and converted back on read.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def key(model, obj_id) -> str:
+        return f"entity:{model.__tablename__}:{obj_id}"
+
+    @staticmethod
+    def scope() -> str:
+        return f"{current_user_tenant()}|{current_user_uuid()}|{','.join(sorted(current_user_roles()))}"
+
+    async def get(self, model, obj_id):
+        """
+        Return the cached record as a detached instance, None on a miss.
+        """
+        try:
+            row = await self.backend.get(self.key(model, obj_id), self.scope())
+        except Exception as e:
+            log.error(f"Entity cache lookup failed: {e}")
+            row = None
+        cache_requests.inc(model=model.__name__, result="miss" if row is None else "hit")
+        if row is None:
+            return None
+        columns = {attr.key: attr.columns[0] for attr in inspect(model).column_attrs}
+        obj = model(**{key: decode_value(columns[key], value) for key, value in row.items() if key in columns})
+        make_transient_to_detached(obj)  # loaded state without pending changes, as if read by a query
+        return obj
+
+    async def set(self, model, obj) -> None:
+        row = jsonable_encoder({attr.key: getattr(obj, attr.key) for attr in inspect(model).column_attrs})
+        try:
+            await self.backend.set(self.key(model, obj.id), self.scope(), row)
+        except Exception as e:
+            log.error(f"Entity cache write failed: {e}")
+
+    async def invalidate(self, model, obj_ids) -> None:
+        try:
+            await self.backend.delete(*[self.key(model, obj_id) for obj_id in obj_ids])
+        except Exception as e:
+            log.error(f"Entity cache invalidation failed: {e}")
+
+    async def invalidate_pending(self, session) -> None:
+        """
+        Invalidate again the records written by a committed unit of work,
+        dropping rows cached by concurrent reads before the commit.
+        """
+        pending = session.info.pop("invalidated", None) or {}
+        for model, obj_ids in pending.items():
+            await self.invalidate(model, obj_ids)
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def build_entity_cache():
+    """
+    Build the cache configured by ENTITY_CACHE_BACKEND (redis, memory or none)
+    """
+    if AC.ENTITY_CACHE_BACKEND == "redis":
+        return EntityCache(RedisBackend(AC.ENTITY_CACHE_URL or "redis://localhost:6379/0", AC.ENTITY_CACHE_TTL))
+    if AC.ENTITY_CACHE_BACKEND == "memory":
+        if AC.WORKERS > 1:
+            log.warning(f"ENTITY_CACHE_BACKEND=memory with {AC.WORKERS} workers, reads may be {AC.ENTITY_CACHE_TTL}s stale after writes on other workers")
+        return EntityCache(MemoryBackend(AC.ENTITY_CACHE_SIZE, AC.ENTITY_CACHE_TTL))
+    return None
+
+
+entity_cache = build_entity_cache()
@@ -0,0 +1,55 @@
+import csv
+import enum
+import io
+import json
+from typing import AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+
+from .depends import db_session
+
+
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def ndjson_chunk(rows: list) -> str:
+    """
+    Render a batch of rows as newline delimited JSON
+    """
+    return "".join(json.dumps(jsonable_encoder(dict(row))) + "\n" for row in rows)
+
+
+def csv_chunk(rows: list, header: bool = False) -> str:
+    """
+    Render a batch of rows as CSV, list values are written as JSON arrays
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header and rows:
+        writer.writerow(rows[0].keys())
+    for row in rows:
+        writer.writerow(json.dumps(value) if isinstance(value, list) else value for value in jsonable_encoder(dict(row)).values())
+    return buffer.getvalue()
+
+
+async def stream_export(model, export_format: ExportFormat) -> AsyncIterator[str]:
+    """
+    Stream every record of model visible to the current user, one chunk per server-side cursor batch.
+    The session is owned by the stream and closed when the client is done or disconnects.
+    """
+    async with db_session() as db:
+        first_batch = True
+        async for rows in model.objects(db).stream():
+            if export_format == ExportFormat.csv:
+                yield csv_chunk(rows, header=first_batch)
+            else:
+                yield ndjson_chunk(rows)
+            first_batch = False
@@ -0,0 +1,119 @@
+import time
+from inspect import isawaitable
+
+from strawberry.extensions import SchemaExtension
+from strawberry.types.graphql import OperationType
+
+from .constants import AppConstants as AC
+from .entity_cache import entity_cache
+from .logger import log
+from .metrics import Histogram
+from .slow_queries import operation_name
+
+operation_seconds = Histogram("graphql_operation_seconds", "GraphQL operation latency", ("operation", "type", "status"))
+resolver_seconds = Histogram("graphql_resolver_seconds", "Latency of asynchronous GraphQL resolvers", ("field",))
+
+# operation names labelled in metrics, first names seen only since clients choose them
+operation_names: set[str] = set()
+
+
+def operation_label(name: str) -> str:
+    """
+    Return the metric label of an operation name, "other" once METRICS_OPERATION_LIMIT names were seen.
+    """
+    if name is None:
+        return "anonymous"
+    if name not in operation_names:
+        if len(operation_names) >= AC.METRICS_OPERATION_LIMIT:
+            return "other"
+        operation_names.add(name)
+    return name
+
+
+class UnitOfWork(SchemaExtension):
+    """
+    Run every mutation operation in one transaction: Manager only flushes while the operation executes,
+    the transaction is committed once at the end, or rolled back when any field failed.
+    Mutations always run on the primary database.
+    Read transactions are ended with a commit too, which keeps the session identity set on the pooled connection.
+    """
+
+    async def on_execute(self):
+        context = self.execution_context.context
+        is_mutation = self.execution_context.operation_type == OperationType.MUTATION
+        if is_mutation:
+            context.db.info["unit_of_work"] = True
+            context.db.info["use_primary"] = True
+        try:
+            yield
+        finally:
+            if is_mutation:
+                context.db.info.pop("unit_of_work", None)
+                result = self.execution_context.result
+                if result is None or result.errors:
+                    log.debug("--- Rolling back mutation operation ----")
+                    await context.db.rollback()
+                    context.db.info.pop("invalidated", None)
+                else:
+                    await context.db.commit()
+                    if entity_cache is not None:
+                        await entity_cache.invalidate_pending(context.db)
+            elif context.has_db and context.db.in_transaction():
+                await context.db.commit()
+
+
+class ReleaseSession(SchemaExtension):
+    """
+    Close the request session as soon as the operation is resolved, before the response is serialized and sent.
+    """
+
+    async def on_operation(self):
+        try:
+            yield
+        finally:
+            await self.execution_context.context.close_db()
+
+
+class Metrics(SchemaExtension):
+    """
+    Record the latency of every operation, and of every asynchronous resolver (root fields, relationship loaders).
+    Synchronous attribute resolvers are not timed, they are the bulk of the fields and cost nothing.
+    """
+
+    def on_operation(self):
+        start = time.perf_counter()
+        yield
+        execution_context = self.execution_context
+        try:
+            operation_type = execution_context.operation_type.value
+        except Exception:
+            operation_type = "unknown"
+        operation_seconds.observe(
+            time.perf_counter() - start,
+            operation=operation_label(execution_context.operation_name),
+            type=operation_type,
+            status="error" if execution_context.errors else "ok",
+        )
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        result = _next(root, info, *args, **kwargs)
+        if isawaitable(result):
+            return self._timed(result, f"{info.parent_type.name}.{info.field_name}")
+        return result
+
+    async def _timed(self, result, field: str):
+        with resolver_seconds.time(field=field):
+            return await result
+
+
+class OperationName(SchemaExtension):
+    """
+    Expose the name of the executing operation to the logs and the slow query log.
+    """
+
+    def on_execute(self):
+        token = operation_name.set(self.execution_context.operation_name or "anonymous")
+        try:
+            yield
+        finally:
+            operation_name.reset(token)
@@ -0,0 +1,120 @@
+import datetime
+from typing import Generic, List, Optional, TypeVar
+
+import strawberry
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, not_, true, false
+
+EnumType = TypeVar("EnumType")
+
+
+@strawberry.input
+class IDFilter:
+    eq: Optional[strawberry.ID] = None
+    ne: Optional[strawberry.ID] = None
+    in_: Optional[List[strawberry.ID]] = strawberry.field(name="in", default=None)
+    nin: Optional[List[strawberry.ID]] = None
+    is_null: Optional[bool] = None
+
+
+@strawberry.input
+class StringFilter:
+    eq: Optional[str] = None
+    ne: Optional[str] = None
+    in_: Optional[List[str]] = strawberry.field(name="in", default=None)
+    nin: Optional[List[str]] = None
+    like: Optional[str] = None
+    ilike: Optional[str] = None
+    is_null: Optional[bool] = None
+
+
+@strawberry.input
+class EnumFilter(Generic[EnumType]):
+    eq: Optional[EnumType] = None
+    ne: Optional[EnumType] = None
+    in_: Optional[List[EnumType]] = strawberry.field(name="in", default=None)
+    nin: Optional[List[EnumType]] = None
+    is_null: Optional[bool] = None
+
+
+@strawberry.input
+class DateFilter:
+    eq: Optional[datetime.date] = None
+    ne: Optional[datetime.date] = None
+    in_: Optional[List[datetime.date]] = strawberry.field(name="in", default=None)
+    gt: Optional[datetime.date] = None
+    gte: Optional[datetime.date] = None
+    lt: Optional[datetime.date] = None
+    lte: Optional[datetime.date] = None
+    is_null: Optional[bool] = None
+
+
+@strawberry.input
+class DateTimeFilter:
+    eq: Optional[datetime.datetime] = None
+    ne: Optional[datetime.datetime] = None
+    gt: Optional[datetime.datetime] = None
+    gte: Optional[datetime.datetime] = None
+    lt: Optional[datetime.datetime] = None
+    lte: Optional[datetime.datetime] = None
+    is_null: Optional[bool] = None
+
+
+@strawberry.input
+class StringArrayFilter:
+    contains: Optional[List[str]] = None
+    contained_by: Optional[List[str]] = None
+    overlaps: Optional[List[str]] = None
+    is_null: Optional[bool] = None
+
+
+OPERATORS = {
+    "eq": lambda column, value: column == value,
+    "ne": lambda column, value: column != value,
+    "in_": lambda column, value: column.in_(value),
+    "nin": lambda column, value: column.not_in(value),
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+    "like": lambda column, value: column.like(value),
+    "ilike": lambda column, value: column.ilike(value),
+    "is_null": lambda column, value: column.is_(None) if value else column.is_not(None),
+    "contains": lambda column, value: column.contains(value),
+    "contained_by": lambda column, value: column.contained_by(value),
+    "overlaps": lambda column, value: column.overlap(value),
+}
+
+
+def _set_fields(filter_input) -> dict:
+    return {k: v for k, v in vars(filter_input).items() if v is not None and not k.startswith("_")}
+
+
+def _compile_column(column, operators) -> list:
+    clauses = []
+    for op, value in _set_fields(operators).items():
+        if op not in OPERATORS:
+            raise HTTPException(400, f"unsupported filter operator <{op}>")
+        clauses.append(OPERATORS[op](column, value))
+    return clauses
+
+
+def compile_filter(model, filter_input):
+    """
+    Compile a GraphQL filter input into a single SQLAlchemy boolean expression on the given model.
+    Fields of the input are ANDed together, `and`/`or`/`not` nest further filters of the same type.
+    Return None when no filter is given.
+    """
+    if filter_input is None:
+        return None
+    clauses = []
+    for field_name, value in _set_fields(filter_input).items():
+        if field_name == "and_":
+            clauses.append(and_(true(), *[compile_filter(model, item) for item in value]))
+        elif field_name == "or_":
+            clauses.append(or_(false(), *[compile_filter(model, item) for item in value]))
+        elif field_name == "not_":
+            clauses.append(not_(compile_filter(model, value)))
+        else:
+            clauses.extend(_compile_column(getattr(model, field_name), value))
+    return and_(true(), *clauses)
@@ -0,0 +1,48 @@
+import time
+
+from httpx import AsyncClient, Limits, Request, Response
+
+from .constants import AppConstants as AC
+from .metrics import Histogram
+
+zeauth_seconds = Histogram("zeauth_request_seconds", "Latency of zeauth calls until the response headers", ("method", "path", "status"))
+
+_http_client: AsyncClient = None
+
+
+async def start_request_timer(request: Request) -> None:
+    request.extensions["start"] = time.perf_counter()
+
+
+async def record_request_time(response: Response) -> None:
+    request = response.request
+    zeauth_seconds.observe(
+        time.perf_counter() - request.extensions["start"],
+        method=request.method,
+        path=request.url.path,  # the query string may carry tokens
+        status=response.status_code,
+    )
+
+
+event_hooks = {"request": [start_request_timer], "response": [record_request_time]}
+
+
+def get_http_client() -> AsyncClient:
+    """
+    Return the process-wide client used for zeauth calls, connections are pooled and kept alive.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = AsyncClient(
+            timeout=AC.ZEAUTH_TIMEOUT,
+            limits=Limits(max_connections=AC.ZEAUTH_MAX_CONNECTIONS, max_keepalive_connections=AC.ZEAUTH_MAX_KEEPALIVE),
+            event_hooks=event_hooks,
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
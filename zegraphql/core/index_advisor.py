@@ -0,0 +1,260 @@
+"""
+Suggest indexes from the SQLAlchemy models and the statement shapes captured by a running service.
+
+    python -m core.index_advisor                                   # models only
+    python -m core.index_advisor --statements statements.json      # saved output of /internal/db/statements
+    python -m core.index_advisor --statements http://host/internal/db/statements --format alembic
+"""
+import argparse
+import importlib
+import json
+import pkgutil
+import re
+import sys
+from dataclasses import dataclass, field
+
+from sqlalchemy import ARRAY, Table
+
+# weights of the suggestions made from the models alone, observed statements add their total seconds
+FOREIGN_KEY_WEIGHT = 1.0
+PAGINATION_WEIGHT = 1.0
+ARRAY_WEIGHT = 0.5
+
+IGNORED_SCHEMAS = ("zekoder_zeauth",)  # tables owned by zeauth
+
+_PREDICATE = re.compile(
+    r"(?:\w+\.)?(?P<table>\w+)\.(?P<column>\w+)\s*(?P<operator>IS NOT NULL|IS NULL|NOT ILIKE|NOT LIKE|ILIKE|LIKE|NOT IN|IN|@>|<@|&&|>=|<=|!=|<>|=|>|<)",
+    re.IGNORECASE,
+)
+_ORDER_COLUMN = re.compile(r"(?:\w+\.)?(?P<table>\w+)\.(?P<column>\w+)")
+_CLAUSE_END = re.compile(r"\b(?:ORDER BY|GROUP BY|LIMIT|OFFSET|RETURNING|FOR UPDATE)\b", re.IGNORECASE)
+
+EQUALITY = ("=", "IN")
+RANGE = (">", "<", ">=", "<=")
+CONTAINMENT = ("@>", "<@", "&&")
+PATTERN = ("LIKE", "ILIKE")
+
+
+@dataclass
+class Suggestion:
+    table: Table
+    columns: tuple
+    using: str = "btree"
+    where: str = None
+    operator_class: str = None
+    score: float = 0.0
+    reasons: list = field(default_factory=list)
+
+    @property
+    def key(self) -> tuple:
+        return (self.table.fullname, self.columns, self.using, self.where, self.operator_class)
+
+    @property
+    def name(self) -> str:
+        suffix = {"gin": "_gin", "btree": ""}.get(self.using, f"_{self.using}")
+        partial = "_partial" if self.where else ""
+        return f"ix_{self.table.name}_{'_'.join(self.columns)}{suffix}{partial}"[:63]
+
+    def sql(self) -> str:
+        operator_class = f" {self.operator_class}" if self.operator_class else ""
+        columns = ", ".join(f"{column}{operator_class}" for column in self.columns)
+        where = f" WHERE {self.where}" if self.where else ""
+        return (
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.name} ON {self.table.fullname} "
+            f"USING {self.using} ({columns}){where};"
+        )
+
+    def alembic(self) -> str:
+        options = [f"schema={self.table.schema!r}"] if self.table.schema else []
+        if self.using != "btree":
+            options.append(f"postgresql_using={self.using!r}")
+        if self.operator_class:
+            options.append(f"postgresql_ops={ {column: self.operator_class for column in self.columns}!r}")
+        if self.where:
+            options.append(f"postgresql_where=sa.text({self.where!r})")
+        options.append("postgresql_concurrently=True")
+        return f"op.create_index({self.name!r}, {self.table.name!r}, {list(self.columns)!r}, {', '.join(options)})"
+
+
+def load_metadata():
+    """
+    Import every business model so that their tables are registered on the declarative metadata.
+    """
+    import business.db_models
+    from core.db_config import Base
+
+    for module in pkgutil.iter_modules(business.db_models.__path__):
+        importlib.import_module(f"business.db_models.{module.name}")
+    return Base.metadata
+
+
+def indexed_prefixes(table: Table) -> set:
+    """
+    Column tuples already served by an index of the table (the primary key, indexes, unique constraints).
+    """
+    prefixes = set()
+    column_lists = [[column.name for column in table.primary_key.columns]]
+    column_lists += [[column.name for column in index.columns] for index in table.indexes]
+    column_lists += [[column.name for column in constraint.columns] for constraint in table.constraints if constraint.__class__.__name__ == "UniqueConstraint"]
+    for columns in column_lists:
+        for length in range(1, len(columns) + 1):
+            prefixes.add(tuple(columns[:length]))
+    return prefixes
+
+
+class IndexAdvisor:
+    """
+    Collect index suggestions for the tables of the metadata, merge them and rank them by estimated benefit.
+    """
+
+    def __init__(self, metadata):
+        self.tables = {
+            table.name: table for table in metadata.tables.values() if table.schema not in IGNORED_SCHEMAS
+        }
+        self.suggestions: dict[tuple, Suggestion] = {}
+
+    def suggest(self, table: Table, columns: tuple, score: float, reason: str, **options) -> None:
+        suggestion = Suggestion(table, tuple(columns), **options)
+        suggestion = self.suggestions.setdefault(suggestion.key, suggestion)
+        suggestion.score += score
+        if reason not in suggestion.reasons:
+            suggestion.reasons.append(reason)
+
+    def tenant_prefix(self, table: Table) -> tuple:
+        """
+        Row level security filters every query on tenant_id, so btree indexes lead with it when the table has one.
+        """
+        return ("tenant_id",) if "tenant_id" in table.c else ()
+
+    def add_model_suggestions(self) -> None:
+        for table in self.tables.values():
+            prefix = self.tenant_prefix(table)
+            if {"created_on", "id"} <= set(table.c.keys()):
+                self.suggest(table, prefix + ("created_on", "id"), PAGINATION_WEIGHT, "keyset pagination ORDER BY created_on, id")
+            for foreign_key in table.foreign_keys:
+                column = foreign_key.parent.name
+                self.suggest(table, (column,), FOREIGN_KEY_WEIGHT, f"foreign key to {foreign_key.target_fullname}, loaded with IN (...)")
+            for column in table.c:
+                if isinstance(column.type, ARRAY):
+                    self.suggest(table, (column.name,), ARRAY_WEIGHT, "array column, filtered with @>, <@ and &&", using="gin")
+
+    def add_statement_suggestions(self, statements: dict) -> None:
+        """
+        statements maps fingerprints to {"statement", "count", "seconds"} as served by /internal/db/statements.
+        """
+        for fingerprint, stats in statements.items():
+            statement = stats["statement"]
+            weight = stats.get("seconds") or stats.get("count") or 1
+            where, order_by = self.split_clauses(statement)
+            predicates = self.predicates(where)
+            for table_name, table_predicates in predicates.items():
+                table = self.tables[table_name]
+                reason = f"statement {fingerprint}"
+                self.add_predicate_suggestions(table, table_predicates, order_by.get(table_name, ()), weight, reason)
+
+    def split_clauses(self, statement: str) -> tuple:
+        where, order_by = "", {}
+        parts = re.split(r"\bWHERE\b", statement, maxsplit=1, flags=re.IGNORECASE)
+        if len(parts) == 2:
+            end = _CLAUSE_END.search(parts[1])
+            where = parts[1][:end.start()] if end else parts[1]
+        order = re.search(r"\bORDER BY\b(?P<columns>.*?)(?:\bLIMIT\b|\bOFFSET\b|\bFOR UPDATE\b|$)", statement, re.IGNORECASE)
+        if order:
+            for match in _ORDER_COLUMN.finditer(order.group("columns")):
+                if match.group("table") in self.tables:
+                    order_by.setdefault(match.group("table"), []).append(match.group("column"))
+        return where, order_by
+
+    def predicates(self, where: str) -> dict:
+        predicates = {}
+        for match in _PREDICATE.finditer(where):
+            table_name, column = match.group("table"), match.group("column")
+            if table_name in self.tables and column in self.tables[table_name].c:
+                operator = match.group("operator").upper()
+                predicates.setdefault(table_name, []).append((column, operator))
+        return predicates
+
+    def add_predicate_suggestions(self, table: Table, predicates: list, order_by: tuple, weight: float, reason: str) -> None:
+        prefix = self.tenant_prefix(table)
+        equality = sorted({column for column, operator in predicates if operator in EQUALITY} - set(prefix))
+        ranges = [column for column, operator in predicates if operator in RANGE and column not in equality]
+        sort = [column for column in order_by if column not in equality]
+        if equality or ranges or sort:
+            # equality columns first, then one range or the sort columns, the order a btree can serve
+            trailing = sort if sort else ranges[:1]
+            self.suggest(table, prefix + tuple(equality) + tuple(dict.fromkeys(trailing)), weight, reason)
+
+        for column, operator in predicates:
+            if operator in CONTAINMENT:
+                self.suggest(table, (column,), weight, reason, using="gin")
+            elif operator in PATTERN:
+                self.suggest(table, (column,), weight, f"{reason}, pattern match (needs pg_trgm)", using="gin", operator_class="gin_trgm_ops")
+            elif operator in ("IS NULL", "IS NOT NULL") and table.c[column].nullable:
+                self.suggest(table, prefix + (column,), weight, reason, where=f"{column} {operator}")
+
+    def ranked(self) -> list[Suggestion]:
+        """
+        Drop suggestions already served by an existing index or by a longer suggested btree index with the same
+        leading columns, and sort the others by score.
+        """
+        suggestions = list(self.suggestions.values())
+        kept = []
+        for suggestion in suggestions:
+            if suggestion.using == "btree" and not suggestion.where:
+                if suggestion.columns in indexed_prefixes(suggestion.table):
+                    continue
+                covering = [
+                    other for other in suggestions
+                    if other is not suggestion and other.table is suggestion.table and other.using == "btree"
+                    and not other.where and len(other.columns) > len(suggestion.columns)
+                    and other.columns[:len(suggestion.columns)] == suggestion.columns
+                ]
+                if covering:
+                    best = max(covering, key=lambda other: other.score)
+                    best.score += suggestion.score
+                    best.reasons.extend(reason for reason in suggestion.reasons if reason not in best.reasons)
+                    continue
+            kept.append(suggestion)
+        return sorted(kept, key=lambda suggestion: (-suggestion.score, suggestion.name))
+
+
+def read_statements(source: str) -> dict:
+    if source.startswith(("http://", "https://")):
+        import httpx
+        response = httpx.get(source, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+    else:
+        with open(source) as file:
+            data = json.load(file)
+    return data.get("statements", data)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Suggest indexes from the models and the captured statement shapes")
+    parser.add_argument("--statements", help="file or URL with the output of /internal/db/statements")
+    parser.add_argument("--format", choices=("sql", "alembic"), default="sql")
+    parser.add_argument("--limit", type=int, default=None, help="number of suggestions to print")
+    args = parser.parse_args(argv)
+
+    advisor = IndexAdvisor(load_metadata())
+    advisor.add_model_suggestions()
+    if args.statements:
+        advisor.add_statement_suggestions(read_statements(args.statements))
+
+    suggestions = advisor.ranked()[:args.limit]
+    if args.format == "alembic":
+        print("import sqlalchemy as sa\nfrom alembic import op\n\n\ndef upgrade():")
+        print("    with op.get_context().autocommit_block():")
+        for suggestion in suggestions:
+            print(f"        # score {suggestion.score:.2f}: {'; '.join(suggestion.reasons)}")
+            print(f"        {suggestion.alembic()}")
+    else:
+        for suggestion in suggestions:
+            print(f"-- score {suggestion.score:.2f}: {'; '.join(suggestion.reasons)}")
+            print(suggestion.sql())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import jwt
+
+from .constants import AppConstants as AC
+from .http_client import get_http_client
+from .logger import log
+
+
+class JWKSClient:
+    """
+    Keeps zeauth's signing keys in memory, refreshes them in the background
+    and verifies tokens without a round trip to zeauth.
+    """
+
+    min_refresh_interval = 30  # seconds between refreshes triggered by unknown key ids
+
+    def __init__(self, url: str, refresh_interval: float):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task = None
+
+    async def refresh(self) -> None:
+        """
+        Fetch the key set from zeauth and replace the cached keys.
+        """
+        async with self._lock:
+            response = await get_http_client().get(self.url)
+            response.raise_for_status()
+            keys = {}
+            for key_data in response.json().get("keys", []):
+                try:
+                    keys[key_data.get("kid")] = jwt.PyJWK(key_data)
+                except jwt.PyJWKError as e:
+                    log.debug(f"Skipping unusable signing key <{key_data.get('kid')}>: {e}")
+            self._keys = keys
+            self._last_refresh = time.monotonic()
+
+    async def get_signing_key(self, kid: str) -> jwt.PyJWK:
+        """
+        Return the signing key for kid, refreshing the key set once when the key is unknown (e.g. after a rotation).
+        """
+        if kid not in self._keys and time.monotonic() - self._last_refresh > self.min_refresh_interval:
+            await self.refresh()
+        if kid not in self._keys:
+            raise jwt.InvalidKeyError(f"Unknown signing key <{kid}>")
+        return self._keys[kid]
+
+    async def verify(self, token: str) -> dict:
+        """
+        Verify the token signature and expiry and return its claims.
+        """
+        header = jwt.get_unverified_header(token)
+        signing_key = await self.get_signing_key(header.get("kid"))
+        return jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=AC.AUTH_JWT_ALGORITHMS,
+            audience=AC.AUTH_JWT_AUDIENCE,
+            options={"require": ["exp", "sub"], "verify_aud": AC.AUTH_JWT_AUDIENCE is not None},
+        )
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                log.error(f"Refreshing signing keys from {self.url} failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+jwks_client = JWKSClient(AC.AUTH_JWKS_URL, AC.AUTH_JWKS_REFRESH_INTERVAL)
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from functools import partial
+
+from sqlalchemy import select
+from strawberry.dataloader import DataLoader
+
+from .slow_queries import manager_call
+
+
+class Loaders:
+    """
+    Per-request registry of DataLoaders, each batching the loads of one model by one column
+    into a single `IN (...)` query.
+    """
+
+    def __init__(self, context):
+        self._context = context
+        self._loaders = {}
+
+    def by_column(self, model, column_name: str, many: bool = False) -> DataLoader:
+        """
+        Return the loader of `model` rows keyed by `column_name`.
+        With many=True every key resolves to a list of rows (one-to-many side of a relationship).
+        """
+        key = (model, column_name, many)
+        if key not in self._loaders:
+            self._loaders[key] = DataLoader(
+                load_fn=partial(self._load, model, column_name, many),
+                cache_key_fn=str,
+            )
+        return self._loaders[key]
+
+    async def _load(self, model, column_name: str, many: bool, keys: list) -> list:
+        column = getattr(model, column_name)
+        token = manager_call.set(f"{model.__name__}.load_by_{column_name}")
+        try:
+            data = await self._context.db.execute(select(model).filter(column.in_(keys)))
+        finally:
+            manager_call.reset(token)
+        grouped = defaultdict(list)
+        for row in data.scalars().all():
+            grouped[str(getattr(row, column_name))].append(row)
+        if many:
+            return [grouped.get(str(key), []) for key in keys]
+        return [grouped.get(str(key), [None])[0] for key in keys]
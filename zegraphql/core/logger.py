@@ -1,4 +1,13 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from .constants import AppConstants as AC
 
 
 class CustomFormatter(logging.Formatter):
@@ -15,30 +24,96 @@ class CustomFormatter(logging.Formatter):
     def __init__(self, fmt):
         super().__init__()
         self.fmt = fmt
-        self.FORMATS = {
-            logging.DEBUG: self.blue + self.fmt + self.reset,
-            logging.INFO: self.green + self.fmt + self.reset,
-            logging.WARNING: self.yellow + self.fmt + self.reset,
-            logging.ERROR: self.red + self.fmt + self.reset,
-            logging.CRITICAL: self.bold_red + self.fmt + self.reset
+        self.FORMATTERS = {
+            logging.DEBUG: logging.Formatter(self.blue + self.fmt + self.reset),
+            logging.INFO: logging.Formatter(self.green + self.fmt + self.reset),
+            logging.WARNING: logging.Formatter(self.yellow + self.fmt + self.reset),
+            logging.ERROR: logging.Formatter(self.red + self.fmt + self.reset),
+            logging.CRITICAL: logging.Formatter(self.bold_red + self.fmt + self.reset),
         }
+        self.default_formatter = logging.Formatter(self.fmt)
+
+    def format(self, record):
+        return self.FORMATTERS.get(record.levelno, self.default_formatter).format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request context fields"""
 
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "file": record.filename,
+            "message": record.getMessage(),
+        }
+        for field in context_fields:
+            data[field] = getattr(record, field, None)
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+request_id: ContextVar[str] = ContextVar('request_id', default=None)
+context_fields: dict[str, ContextVar] = {"request_id": request_id}  # record attribute -> context variable
+
+
+def add_context_field(name: str, variable: ContextVar) -> None:
+    """
+    Add the value of a context variable (e.g. the tenant of the request) to every log record
+    """
+    context_fields[name] = variable
 
 
+class ContextFilter(logging.Filter):
+    """
+    Copy the request context onto the record, in the caller's context before the record is queued.
+    Debug records are kept with a probability of LOG_DEBUG_SAMPLE_RATE.
+    """
+
+    def filter(self, record):
+        if record.levelno <= logging.DEBUG and AC.LOG_DEBUG_SAMPLE_RATE < 1 and random.random() >= AC.LOG_DEBUG_SAMPLE_RATE:
+            return False
+        for field, variable in context_fields.items():
+            setattr(record, field, variable.get())
+        return True
+
+
+class RecordQueueHandler(QueueHandler):
+    """
+    Queue records with their exception info, only the message is merged with its arguments here,
+    formatting and tracebacks are left to the listener thread.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
 # Create custom logger logging all five levels
 log = logging.getLogger(__name__)
-log.setLevel(logging.DEBUG)
+log.setLevel(AC.LOG_LEVEL if AC.LOG_LEVEL in LOG_LEVELS else logging.INFO)
 
 # Define format for logs
 fmt = '%(filename)s | %(levelname)8s | %(message)s'
 
-# Create stdout handler for logging to the console (logs all five levels)
+# Create stdout handler for logging to the console, written by the listener thread off the event loop
 stdout_handler = logging.StreamHandler()
 stdout_handler.setLevel(logging.DEBUG)
-stdout_handler.setFormatter(CustomFormatter(fmt))
+stdout_handler.setFormatter(JsonFormatter() if AC.LOG_FORMAT == "json" else CustomFormatter(fmt))
+
+log_queue = queue.SimpleQueue()
+queue_handler = RecordQueueHandler(log_queue)
+queue_handler.addFilter(ContextFilter())
+log.addHandler(queue_handler)
+
+listener = QueueListener(log_queue, stdout_handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
 
-log.addHandler(stdout_handler)
\ No newline at end of file
+if AC.LOG_LEVEL not in LOG_LEVELS:
+    log.warning(f"Unknown LOG_LEVEL <{AC.LOG_LEVEL}>, expected one of {', '.join(LOG_LEVELS)}, using INFO")
@@ -1,7 +1,35 @@
+import json
+import uuid
+import asyncio
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession 
-from sqlalchemy import select, delete, update, insert
-from core.depends import get_db
+from sqlalchemy import select, delete, update, insert, tuple_, func, inspect
+from sqlalchemy.orm import load_only
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import Executable, ClauseElement
+from core.depends import get_db, current_user_uuid
+from .db_config import db_session
 from .logger import log
+from .constants import AppConstants as AC
+from .pagination import decode_cursor
+from .entity_cache import entity_cache
+from .slow_queries import record_manager_call
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) of a select, whose parameters are bound like the select's own.
+    """
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def compile_explain(element, compiler, **kwargs):
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kwargs)}"
+
 
 class Manager:
     """
@@ -14,6 +42,8 @@ class Manager:
         self.db = database
         self.Model = model
         self._query = {}  # Instantiate a query, update it on get/filter call
+        self._where = []  # SQL expressions added on where call
+        self._only = []  # column attributes to load, all columns when empty
 
     def __str__(self):
         """
@@ -21,26 +51,50 @@ class Manager:
         """
         return "%s_%s" % (self.__class__.__name__, self.Model.__name__)
 
-    async def __len__(self):
-        """
-        Return the number of records in the database based on the current query.
-        """
-        data = await self.__fetch()
-        return len(data)
-    
-    async def __iter__(self):
+    @record_manager_call
+    async def __aiter__(self):
         """
         Iterate over the records fetched from the database based on the current query.
         """
         data = await self.__fetch()
-        for obj in data:
+        for obj in data.scalars():
             yield obj
 
-    def __getitem__(self, item):
+    @record_manager_call
+    async def count(self, estimated: bool = False, **query) -> int:
+        """
+        Return the number of records matching the current query with a single SELECT count(*).
+        With estimated=True the planner's row estimate is returned instead, avoiding a full scan on large tables.
+        """
+        self.update_query(query)
+        if estimated:
+            return await self._estimated_count()
+        statement = select(func.count()).select_from(self.Model).filter_by(**self._query).filter(*self._where)
+        data = await self.db.execute(statement)
+        return data.scalar_one()
+
+    async def detached_count(self, estimated: bool = False) -> int:
         """
-        Get an item from the records fetched from the database.
+        Count the current query in a session of its own, for callers running alongside other users of
+        the request session (e.g. the totalCount field next to the DataLoaders of the connection nodes).
         """
-        return list(self)[item]
+        async with db_session() as session:
+            manager = Manager(self.Model, session)
+            manager._query, manager._where = dict(self._query), list(self._where)
+            return await manager.count(estimated=estimated)
+
+    async def _estimated_count(self) -> int:
+        """
+        Read the row estimate of the current query from EXPLAIN, which derives it from pg_class.reltuples
+        and the column statistics, so filters and row level security policies are taken into account.
+        """
+        statement = select(self.Model.id).filter_by(**self._query).filter(*self._where)
+        connection = await self.db.connection(bind_arguments={"clause": statement})
+        data = await connection.execute(Explain(statement))
+        plan = data.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
     def update_query(self, query):
         """
@@ -48,35 +102,110 @@ class Manager:
         """
         self._query.update(query)
 
+    def _statement(self):
+        """
+        Build the select statement for the current query.
+        """
+        statement = select(self.Model).filter_by(**self._query).filter(*self._where)
+        if self._only:
+            statement = statement.options(load_only(*[getattr(self.Model, column) for column in self._only], raiseload=True))
+        return statement
+
     async def __fetch(self):
         """
         Asynchronously fetch records from the database based on the current query.
         """
-        return await self.db.execute(select(self.Model).filter_by(**self._query))
+        return await self.db.execute(self._statement())
     
+    @record_manager_call
     async def get(self, **query):
         """
         Get a single record from the database based on the provided query.
         """
         self.update_query(query)
+        if not self._cacheable():
+            data = await self.__fetch()
+            return data.scalars().first()
+
+        obj = await entity_cache.get(self.Model, self._query["id"])
+        if obj is not None:
+            return await self.db.merge(obj, load=False)
+        self._only = []  # cache complete records
         data = await self.__fetch()
-        return data.scalars().first()
+        obj = data.scalars().first()
+        if obj is not None:
+            await entity_cache.set(self.Model, obj)
+        return obj
+
+    def _cacheable(self) -> bool:
+        """
+        Return True when the query is a plain lookup by id the entity cache can answer.
+        Mutations and requests sent with Cache-Control: no-cache always read the database.
+        """
+        return entity_cache is not None\
+            and set(self._query) == {"id"}\
+            and not self._where\
+            and not self.db.info.get("unit_of_work")\
+            and not self.db.info.get("bypass_cache")
     
+    @record_manager_call
     async def all(self, offset: int = 0, limit: int = 10, **query):
         """
         Retrieve all records from the database based on the current query, with optional offset and limit.
         """
         self.update_query(query)
-        data = await self.__fetch()
+        statement = self._statement()\
+                    .order_by(self.Model.created_on, self.Model.id)\
+                    .offset(offset*limit)\
+                    .limit(limit)
+        data = await self.db.execute(statement)
+        return data.scalars().all()
+
+    @record_manager_call
+    async def paginate(self, first: int = 10, after: str = None, **query):
+        """
+        Retrieve a page of records using keyset pagination on (created_on, id).
+        Return the records and whether a next page exists.
+        """
+        if first <= 0:
+            raise HTTPException(400, f"first must be a positive number, got <{first}>")
+        self.update_query(query)
+        statement = self._statement()
+        if after:
+            created_on, obj_id = decode_cursor(after)
+            statement = statement.filter(tuple_(self.Model.created_on, self.Model.id) > tuple_(created_on, obj_id))
+        statement = statement\
+                    .order_by(self.Model.created_on, self.Model.id)\
+                    .limit(first + 1)
+        data = await self.db.execute(statement)
         data = data.scalars().all()
-        return data[offset*limit:(offset+1)*limit]
+        return data[:first], len(data) > first
 
+    @record_manager_call
+    async def stream(self, batch_size: int = AC.EXPORT_BATCH_SIZE, **query):
+        """
+        Yield the records of the current query as batches of column mappings read through a server-side cursor.
+        Rows are not added to the session's identity map so memory stays bounded by batch_size,
+        and the next batch is only fetched once the caller asks for it.
+        """
+        self.update_query(query)
+        columns = self._only or [attr.key for attr in inspect(self.Model).column_attrs]
+        statement = select(*[getattr(self.Model, column) for column in columns])\
+                    .filter_by(**self._query)\
+                    .filter(*self._where)\
+                    .order_by(self.Model.created_on, self.Model.id)\
+                    .execution_options(yield_per=batch_size)
+        data = await self.db.stream(statement)
+        async for rows in data.mappings().partitions():
+            yield rows
+
+    @record_manager_call
     async def get_multiple(self, obj_ids):
         """
         Get a multi records from the database based on the provided IDs.
         """
         # TODO review this method with async db 
-        data = await self.db.execute(select(self.Model).filter(self.Model.id.in_(obj_ids)).filter_by(**self._query))
+        data = await self.db.execute(self._statement().filter(self.Model.id.in_(obj_ids)))
         return data.scalars().all()
 
     def filter(self, **query):
@@ -86,6 +215,21 @@ class Manager:
         self.update_query(query)
         return self
 
+    def where(self, *clauses):
+        """
+        Add SQL expressions (e.g. compiled GraphQL filters) to the query, None values are ignored.
+        """
+        self._where.extend(clause for clause in clauses if clause is not None)
+        return self
+
+    def only(self, *columns):
+        """
+        Restrict the loaded columns to the given attribute names, other columns are deferred.
+        """
+        self._only.extend(columns)
+        return self
+
+    @record_manager_call
     async def create(self, only_add: bool = False, **kwargs):
         """
         Create a new record in the database and executing pre and post triggers if exist
@@ -104,35 +248,114 @@ class Manager:
 
         return obj
 
+    @record_manager_call
     async def save(self, obj):
         """
         Save changes to the database after adding a new record.
         """
         self.db.add(obj)
-        await self.db.commit()
+        await self._commit()
         await self.db.refresh(obj)
+        await self._invalidate([obj.id])
 
+    @record_manager_call
     async def update(self, obj_id, **kwargs):
         """
-        Update an existing record in the database.
+        Update an existing record in the database with a single UPDATE ... RETURNING.
+        When signal data is given without old data, the old record is captured in the same statement through a CTE.
+        Return the updated record, or None when it does not exist.
         """
         model_data = kwargs.get("model_data", {})
-        if kwargs.get("signal_data"):
-            model_data.update(await self.pre_update(**kwargs["signal_data"]))
+        signal_data = kwargs.get("signal_data")
+        if signal_data:
+            if not signal_data.get("old_data") and self._overrides("pre_update"):
+                old_row = await self.get(id=obj_id)
+                if old_row is None:
+                    return None
+                signal_data["old_data"] = old_row.to_dict()
+            model_data.update(await self.pre_update(**signal_data))
+
+        table = self.Model.__table__
+        old_row = select(table).filter(table.c.id == obj_id).cte("old_row")
         statement = update(self.Model)\
-                    .filter(self.Model.id == obj_id)\
-                    .values(model_data)
-        
-        await self.db.execute(statement)
-        await self.db.commit()
-        updated_row = await self.get(id=obj_id)
-        await self.db.refresh(updated_row)
+                    .filter(self.Model.id == old_row.c.id)\
+                    .values(model_data)\
+                    .returning(self.Model, *old_row.c)
+        data = await self.db.execute(
+            statement,
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        row = data.first()
+        await self._commit()
+        if row is None:
+            return None
+        updated_row = row[0]
+        await self._invalidate([obj_id])
 
-        if kwargs.get("signal_data"):
-            kwargs.get("signal_data")["new_data"] = updated_row.to_dict()
-            await self.post_update(**kwargs["signal_data"])
+        if signal_data:
+            if not signal_data.get("old_data"):
+                signal_data["old_data"] = dict(zip(old_row.c.keys(), row[1:]))
+            signal_data["new_data"] = updated_row.to_dict()
+            await self.post_update(**signal_data)
         return updated_row
 
+    @record_manager_call
+    async def upsert_multiple(self, items: list[dict], **kwargs):
+        """
+        Insert or update many records with INSERT ... ON CONFLICT (id) DO UPDATE ... RETURNING in one transaction.
+        Records are grouped by their set of columns so each update only touches the given columns.
+        Items repeating an id are merged into one row, the last one winning, since a single
+        INSERT ... ON CONFLICT cannot affect the same row twice.
+        Return the saved records in input order and the per-index errors raised by the pre triggers.
+        """
+        signal_data = kwargs.get("signal_data") or {}
+        try:
+            items = [dict(item, id=uuid.UUID(str(item["id"])) if item.get("id") else uuid.uuid4()) for item in items]
+        except ValueError as e:
+            raise HTTPException(400, f"invalid id in upsert items: {e}")
+        existing = {obj.id: obj for obj in await self.get_multiple(list({item["id"] for item in items}))}
+
+        unique = {}  # id -> (index of the last item with this id, merged item)
+        for index, item in enumerate(items):
+            merged = dict(unique[item["id"]][1], **item) if item["id"] in unique else item
+            unique[item["id"]] = (index, merged)
+
+        creates, updates = [], []
+        for index, item in sorted(unique.values(), key=lambda pair: pair[0]):
+            old_obj = existing.get(item["id"])
+            entry = {"index": index, "new_data": item, "old_data": old_obj.to_dict() if old_obj else {}}
+            (updates if old_obj else creates).append(entry)
+
+        creates, create_errors = await self.pre_create_many(creates, **signal_data)
+        updates, update_errors = await self.pre_update_many(updates, **signal_data)
+        errors_info = sorted(create_errors + update_errors, key=lambda error: error["index"])
+
+        groups = {}
+        for entry in creates + updates:
+            groups.setdefault(frozenset(entry["model_data"]), []).append(entry["model_data"])
+
+        saved = {}
+        for columns, rows in groups.items():
+            statement = pg_insert(self.Model).values(rows)
+            set_ = {column: statement.excluded[column] for column in columns if column != "id"}
+            set_.update(updated_on=func.now(), updated_by=current_user_uuid())
+            statement = statement\
+                        .on_conflict_do_update(index_elements=[self.Model.id], set_=set_)\
+                        .returning(self.Model)
+            data = await self.db.execute(statement, execution_options={"populate_existing": True})
+            saved.update({obj.id: obj for obj in data.scalars().all()})
+        await self._commit()
+        await self._invalidate(list(saved))
+
+        for entry in creates + updates:
+            entry["new_data"] = saved[entry["model_data"]["id"]].to_dict()
+        if signal_data:
+            await self.post_create_many(creates, **signal_data)
+            await self.post_update_many(updates, **signal_data)
+
+        return [saved[item["id"]] for item in items if item["id"] in saved], errors_info
+
+    @record_manager_call
     async def delete(self, obj_id, **kwargs):
         """
         Delete a record from the database.
@@ -144,35 +367,88 @@ class Manager:
             return
         
         await self.db.execute(delete(self.Model).filter(self.Model.id == obj_id))
-        await self.db.commit()
+        await self._commit()
+        await self._invalidate([obj_id])
         
         if kwargs.get("signal_data"):
             kwargs.get("signal_data")["new_data"] = is_delete
             await self.post_delete(**kwargs["signal_data"])
 
+    @record_manager_call
     async def delete_multiple(self, obj_ids: list, **kwargs):
         """
-        Delete multiple records from the database.
-        """      
-        is_delete = True
-        all_old_data = kwargs.get("signal_data")['old_data']
-        if kwargs.get("signal_data"):
-            for obj in all_old_data:
-                kwargs["signal_data"]["old_data"] = dict(obj.__dict__) if obj else {}
-                is_delete = await self.pre_delete(**kwargs["signal_data"])
-        if not is_delete:
+        Delete multiple records from the database with a single DELETE ... RETURNING id.
+        Old records are only fetched when delete triggers are defined.
+        Return the ids of the deleted records, or None when a pre trigger cancelled the delete.
+        """
+        signal_data = kwargs.get("signal_data")
+        old_rows = []
+        if signal_data and self._overrides("pre_delete", "post_delete", "pre_delete_many", "post_delete_many"):
+            old_rows = [obj.to_dict() for obj in await self.get_multiple(obj_ids)]
+            if not await self.pre_delete_many(old_rows, **signal_data):
+                return
+
+        deleted = await self.db.execute(
+            delete(self.Model).filter(self.Model.id.in_(obj_ids)).returning(self.Model.id),
+            execution_options={"synchronize_session": False},
+        )
+        deleted_ids = deleted.scalars().all()
+        await self._commit()
+        await self._invalidate(deleted_ids)
+
+        if old_rows:
+            deleted_keys = {str(obj_id) for obj_id in deleted_ids}
+            await self.post_delete_many([row for row in old_rows if str(row["id"]) in deleted_keys], **signal_data)
+
+        return deleted_ids
+
+    async def _commit(self):
+        """
+        Commit the transaction, or only flush it when a unit of work (core.extensions.UnitOfWork) owns the session.
+        """
+        if self.db.info.get("unit_of_work"):
+            await self.db.flush()
+        else:
+            await self.db.commit()
+
+    async def _invalidate(self, obj_ids: list) -> None:
+        """
+        Drop written records from the entity cache, and once more after the commit when a unit of work owns the session.
+        """
+        if entity_cache is None:
             return
+        await entity_cache.invalidate(self.Model, obj_ids)
+        if self.db.info.get("unit_of_work"):
+            self.db.info.setdefault("invalidated", {}).setdefault(self.Model, set()).update(obj_ids)
 
-        deleted = await self.db.execute(delete(self.Model).filter(self.Model.id.in_(obj_ids)))
-        await self.db.commit()
+    def _overrides(self, *hooks) -> bool:
+        """
+        Return True when any of the given trigger hooks is overridden by a subclass.
+        """
+        return any(getattr(type(self), hook) is not getattr(Manager, hook) for hook in hooks)
 
-        if kwargs.get("signal_data"):
-            kwargs.get("signal_data")["new_data"] = is_delete
-            for obj in all_old_data:
-                kwargs["signal_data"]["old_data"] = dict(obj.__dict__) if obj else {}
-                await self.post_delete(**kwargs["signal_data"])
+    async def _gather_hooks(self, hook, rows: list[dict], **kwargs) -> list:
+        """
+        Run a single-record trigger for every old record, one after the other unless TRIGGER_CONCURRENCY > 1.
+        Concurrent triggers must not use the request session, and the remaining ones are cancelled when one fails.
+        """
+        if AC.TRIGGER_CONCURRENCY <= 1:
+            return [await hook(**dict(kwargs, old_data=row)) for row in rows]
+
+        semaphore = asyncio.Semaphore(AC.TRIGGER_CONCURRENCY)
 
-        return deleted.rowcount
+        async def run(row):
+            async with semaphore:
+                return await hook(**dict(kwargs, old_data=row))
+
+        tasks = [asyncio.ensure_future(run(row)) for row in rows]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
     async def pre_create(self, **kwargs):
         """
@@ -186,6 +462,20 @@ class Manager:
         """
         pass
 
+    async def pre_create_many(self, entries: list[dict], **kwargs):
+        """
+        Perform pre-save operations on a batch of {"index", "new_data", "old_data"} entries.
+        Set "model_data" on the accepted entries, return them and the per-index errors of the rejected ones.
+        """
+        return await self._run_pre_hooks(self.pre_create, entries, **kwargs)
+
+    async def post_create_many(self, entries: list[dict], **kwargs):
+        """
+        Perform post-save operations on a batch of saved entries.
+        """
+        for entry in entries:
+            await self.post_create(**dict(kwargs, new_data=entry["new_data"], old_data=entry["old_data"]))
+
     async def pre_update(self, **kwargs):
         """
         Perform pre-update operations and return additional model data.
@@ -198,6 +488,36 @@ class Manager:
         """
         pass
 
+    async def pre_update_many(self, entries: list[dict], **kwargs):
+        """
+        Perform pre-update operations on a batch of {"index", "new_data", "old_data"} entries.
+        Set "model_data" on the accepted entries, return them and the per-index errors of the rejected ones.
+        """
+        return await self._run_pre_hooks(self.pre_update, entries, **kwargs)
+
+    async def post_update_many(self, entries: list[dict], **kwargs):
+        """
+        Perform post-update operations on a batch of updated entries.
+        """
+        for entry in entries:
+            await self.post_update(**dict(kwargs, new_data=entry["new_data"], old_data=entry["old_data"]))
+
+    async def _run_pre_hooks(self, hook, entries: list[dict], **kwargs):
+        """
+        Run a single-record pre trigger on every entry, collecting errors in the errors_info shape.
+        """
+        accepted, errors_info = [], []
+        for entry in entries:
+            model_data = dict(entry["new_data"])
+            try:
+                if kwargs:
+                    model_data.update(await hook(**dict(kwargs, new_data=entry["new_data"], old_data=entry["old_data"])))
+            except HTTPException as e:
+                errors_info.append({"index": entry["index"], "errors": e.detail})
+                continue
+            accepted.append(dict(entry, model_data=model_data))
+        return accepted, errors_info
+
     async def pre_delete(self, **kwargs):
         """
         Perform pre-delete operations and return a boolean indicating whether to proceed with the delete.
@@ -209,3 +529,15 @@ class Manager:
         Perform post-delete operations.
         """
         pass
+
+    async def pre_delete_many(self, old_rows: list[dict], **kwargs):
+        """
+        Perform pre-delete operations on all the old records and return a boolean indicating whether to proceed with the delete.
+        """
+        return all(await self._gather_hooks(self.pre_delete, old_rows, **kwargs))
+
+    async def post_delete_many(self, old_rows: list[dict], **kwargs):
+        """
+        Perform post-delete operations on all the deleted records.
+        """
+        await self._gather_hooks(self.post_delete, old_rows, **dict(kwargs, new_data=True))
@@ -0,0 +1,133 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+registry: dict = {}  # metric name -> metric
+
+
+class Metric:
+    """
+    Base of the in-process metrics, values are kept per label set.
+    """
+    kind = None
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._lock = threading.Lock()  # pool checkouts are observed from greenlet and worker threads
+        registry[name] = self
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        super().__init__(name, description, labels)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self) -> list[dict]:
+        return [{"labels": dict(zip(self.labels, key)), "value": value} for key, value in self.values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    default_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = None):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets or self.default_buckets)
+        self.values: dict[tuple, list] = {}  # label values -> [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            if key not in self.values:
+                self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts, total, count = self.values[key]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            self.values[key][1:] = [total + value, count + 1]
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the with block, in seconds
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> list[dict]:
+        data = []
+        for key, (counts, total, count) in self.values.items():
+            cumulative, buckets = 0, {}
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                buckets[str(bound)] = cumulative
+            data.append({"labels": dict(zip(self.labels, key)), "buckets": buckets, "sum": total, "count": count})
+        return data
+
+
+def snapshot(prefix: str = "") -> dict:
+    """
+    Return the current values of every metric whose name starts with prefix.
+    """
+    return {name: metric.snapshot() for name, metric in registry.items() if name.startswith(prefix)}
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _histogram_lines(metric: Histogram, key: tuple, counts: list, total: float, count: int) -> list[str]:
+    lines, cumulative = [], 0
+    for bound, bucket_count in zip(metric.buckets, counts):
+        cumulative += bucket_count
+        labels = _labels(metric.labels, key, 'le="%s"' % bound)
+        lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+    labels = _labels(metric.labels, key, 'le="+Inf"')
+    lines.append(f"{metric.name}_bucket{labels} {count}")
+    labels = _labels(metric.labels, key)
+    lines.append(f"{metric.name}_sum{labels} {total}")
+    lines.append(f"{metric.name}_count{labels} {count}")
+    return lines
+
+
+def render() -> str:
+    """
+    Render every metric in the Prometheus text exposition format
+    """
+    lines = []
+    for name, metric in list(registry.items()):
+        lines.append(f"# HELP {name} {metric.description}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        with metric._lock:
+            values = list(metric.values.items())
+            if isinstance(metric, Histogram):
+                values = [(key, (list(counts), total, count)) for key, (counts, total, count) in values]
+        for key, value in values:
+            if isinstance(metric, Histogram):
+                lines.extend(_histogram_lines(metric, key, *value))
+            else:
+                lines.append(f"{name}{_labels(metric.labels, key)} {value}")
+    return "\n".join(lines) + "\n"
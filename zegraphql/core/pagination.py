@@ -0,0 +1,67 @@
+import base64
+import datetime
+import uuid
+from typing import Awaitable, Callable, Generic, List, Optional, TypeVar
+
+import strawberry
+from fastapi import HTTPException
+
+NodeType = TypeVar("NodeType")
+
+
+def encode_cursor(created_on: datetime.datetime, obj_id) -> str:
+    """
+    Build an opaque cursor from the (created_on, id) keyset of a record
+    """
+    raw = f"{created_on.isoformat()}|{obj_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, uuid.UUID]:
+    """
+    Return the (created_on, id) keyset stored inside an opaque cursor, the id as a UUID so it compares with the uuid column
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_on, obj_id = raw.split("|", 1)
+        return datetime.datetime.fromisoformat(created_on), uuid.UUID(obj_id)
+    except Exception:
+        raise HTTPException(400, f"invalid cursor <{cursor}>")
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str] = None
+
+
+@strawberry.type
+class Edge(Generic[NodeType]):
+    cursor: str
+    node: NodeType
+
+
+@strawberry.type
+class Connection(Generic[NodeType]):
+    edges: List[Edge[NodeType]]
+    page_info: PageInfo
+    count: strawberry.Private[Optional[Callable[..., Awaitable[int]]]] = None
+
+    @strawberry.field(description="Number of records matching the filters, estimated from the query plan when estimated is true")
+    async def total_count(self, estimated: bool = False) -> Optional[int]:
+        if self.count is None:
+            return None
+        return await self.count(estimated=estimated)
+
+    @classmethod
+    def from_rows(cls, rows: list, has_next_page: bool, count: Callable[..., Awaitable[int]] = None):
+        """
+        Wrap a page of records fetched by Manager.paginate into a connection,
+        count is only awaited when totalCount is selected (e.g. Manager.detached_count)
+        """
+        edges = [Edge(cursor=encode_cursor(row.created_on, row.id), node=row) for row in rows]
+        return cls(
+            edges=edges,
+            page_info=PageInfo(has_next_page=has_next_page, end_cursor=edges[-1].cursor if edges else None),
+            count=count,
+        )
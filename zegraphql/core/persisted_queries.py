@@ -0,0 +1,62 @@
+import hashlib
+
+from graphql import GraphQLError
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http.exceptions import HTTPException
+from strawberry.types import ExecutionResult
+
+from .cache import TTLCache
+from .constants import AppConstants as AC
+
+# sha256 hash -> query string registered by clients
+persisted_queries = TTLCache(maxsize=AC.APQ_CACHE_SIZE, ttl=AC.APQ_TTL)
+
+
+class PersistedQueryNotFound(Exception):
+    pass
+
+
+class PersistedQueryRouter(GraphQLRouter):
+    """
+    GraphQL router implementing Automatic Persisted Queries (the Apollo protocol):
+    clients send the sha256 hash of the query in extensions.persistedQuery, and the full query
+    only once, after the server answered PERSISTED_QUERY_NOT_FOUND.
+    """
+
+    async def parse_http_body(self, request):
+        request_data = await super().parse_http_body(request)
+        persisted_query = (await self._extensions(request)).get("persistedQuery")
+        if not persisted_query:
+            return request_data
+
+        query_hash = persisted_query.get("sha256Hash")
+        if request_data.query is None:
+            request_data.query = persisted_queries.get(query_hash)
+            if request_data.query is None:
+                raise PersistedQueryNotFound()
+        elif hashlib.sha256(request_data.query.encode()).hexdigest() == query_hash:
+            persisted_queries.set(query_hash, request_data.query)
+        else:
+            raise HTTPException(400, "provided sha does not match query")
+        return request_data
+
+    def should_render_graphql_ide(self, request) -> bool:
+        return "extensions" not in request.query_params and super().should_render_graphql_ide(request)
+
+    async def _extensions(self, request) -> dict:
+        if request.method == "GET":
+            extensions = request.query_params.get("extensions")
+            return self.parse_json(extensions) if extensions else {}
+        if "application/json" in (request.content_type or ""):
+            data = self.parse_json(await request.get_body())
+            return (data.get("extensions") or {}) if isinstance(data, dict) else {}
+        return {}
+
+    async def execute_operation(self, request, context, root_value) -> ExecutionResult:
+        try:
+            return await super().execute_operation(request, context, root_value)
+        except PersistedQueryNotFound:
+            return ExecutionResult(
+                data=None,
+                errors=[GraphQLError("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})],
+            )
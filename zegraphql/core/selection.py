@@ -0,0 +1,52 @@
+from functools import lru_cache
+
+from sqlalchemy import inspect
+from strawberry.types.nodes import SelectedField
+from strawberry.utils.str_converters import to_camel_case
+
+ALWAYS_LOADED = ("id", "created_on")  # needed for relationship loaders and pagination cursors
+
+
+def _fields(selections: list) -> list[SelectedField]:
+    """
+    Flatten fragments into the list of selected fields.
+    """
+    fields = []
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            fields.append(selection)
+        else:
+            fields.extend(_fields(selection.selections))
+    return fields
+
+
+@lru_cache(maxsize=None)
+def _field_columns(model) -> dict:
+    """
+    Map every GraphQL field name of the model's type to the column attributes it reads.
+    """
+    mapper = inspect(model)
+    columns = {to_camel_case(attr.key): [attr.key] for attr in mapper.column_attrs}
+    for relationship in mapper.relationships:
+        columns[to_camel_case(relationship.key)] = [
+            mapper.get_property_by_column(column).key for column in relationship.local_columns
+        ]
+    return columns
+
+
+def selected_columns(info, model, path: tuple = ()) -> list[str]:
+    """
+    Return the column attributes of `model` needed to resolve the selection set of the current field.
+    `path` walks down nested fields first, e.g. ("edges", "node") for a connection.
+    """
+    selections = _fields(info.selected_fields)
+    for name in path:
+        selections = _fields([selection for field in selections for selection in field.selections])
+        selections = [field for field in selections if field.name == name]
+    selections = _fields([selection for field in selections for selection in field.selections])
+
+    field_columns = _field_columns(model)
+    columns = set(ALWAYS_LOADED)
+    for field in selections:
+        columns.update(field_columns.get(field.name, []))
+    return sorted(columns)
@@ -0,0 +1,111 @@
+import collections
+import datetime
+import functools
+import inspect
+import json
+import random
+from contextvars import ContextVar
+
+from .constants import AppConstants as AC
+from .logger import log, add_context_field
+from .sql_fingerprint import fingerprint, normalize
+
+manager_call: ContextVar[str] = ContextVar('manager_call', default=None)  # e.g. "DocumentModel.paginate"
+operation_name: ContextVar[str] = ContextVar('operation_name', default=None)  # GraphQL operation being executed
+add_context_field("operation", operation_name)
+
+# most recent slow statements, served by /internal/db/slow-queries
+slow_queries = collections.deque(maxlen=AC.SLOW_QUERY_BUFFER_SIZE)
+
+
+def record_manager_call(method):
+    """
+    Decorate a Manager method so that the statements it runs are attributed to it and its model.
+    """
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def generator_wrapper(self, *args, **kwargs):
+            token = manager_call.set(f"{self.Model.__name__}.{method.__name__}")
+            try:
+                async for item in method(self, *args, **kwargs):
+                    yield item
+            finally:
+                manager_call.reset(token)
+        return generator_wrapper
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        token = manager_call.set(f"{self.Model.__name__}.{method.__name__}")
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            manager_call.reset(token)
+    return wrapper
+
+
+def parameter_shape(value) -> str:
+    """
+    Describe a bound parameter without its value, which may hold personal data
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple, set)):
+        return f"list[{len(value)}]"
+    return type(value).__name__
+
+
+def parameters_shape(parameters):
+    if isinstance(parameters, dict):
+        return {key: parameter_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [parameter_shape(value) for value in parameters]
+    return parameter_shape(parameters)
+
+
+def explain(connection, statement: str, parameters) -> list:
+    """
+    Run EXPLAIN (ANALYZE, BUFFERS) on a new DBAPI cursor of the same connection, so that no engine event fires,
+    inside a savepoint so that a failing EXPLAIN does not abort the request transaction.
+    """
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+            plan = cursor.fetchone()[0]
+        finally:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        return json.loads(plan) if isinstance(plan, str) else plan
+    finally:
+        cursor.close()
+
+
+def check_statement(connection, statement: str, parameters, duration: float) -> None:
+    """
+    Log statements slower than SLOW_QUERY_THRESHOLD and keep them in the ring buffer,
+    with an EXPLAIN plan for a sample (SLOW_QUERY_EXPLAIN_RATE) of the SELECT statements.
+    """
+    if duration < AC.SLOW_QUERY_THRESHOLD:
+        return
+    entry = {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "duration": round(duration, 6),
+        "fingerprint": fingerprint(statement),
+        "statement": normalize(statement),
+        "parameters": parameters_shape(parameters),
+        "manager_call": manager_call.get(),
+        "operation": operation_name.get(),
+        "explain": None,
+    }
+    log.warning(
+        f"Slow statement {entry['duration']}s from {entry['manager_call']} in operation {entry['operation']}: "
+        f"{entry['statement']} parameters {entry['parameters']}"
+    )
+    if statement.lstrip()[:6].upper() == "SELECT" and random.random() < AC.SLOW_QUERY_EXPLAIN_RATE:
+        try:
+            entry["explain"] = explain(connection, statement, parameters)
+        except Exception as e:
+            log.error(f"EXPLAIN of slow statement {entry['fingerprint']} failed: {e}")
+    slow_queries.append(entry)
@@ -0,0 +1,46 @@
+import hashlib
+import re
+from functools import lru_cache
+
+from .constants import AppConstants as AC
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|%s|\?|(?<!:):(?!:)\w+")
+_PLACEHOLDER = r"(?:\?(?:::[\w \[\]]+)?|DEFAULT)"  # optionally cast, as asyncpg renders $1::UUID
+_ROW = rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)"
+_IN_LIST = re.compile(rf"\bIN\s*{_ROW}", re.IGNORECASE)
+_VALUES_LIST = re.compile(rf"\bVALUES\s*({_ROW})(?:\s*,\s*{_ROW})+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+# fingerprint -> normalized statement, first statements seen only
+statements: dict[str, str] = {}
+
+
+@lru_cache(maxsize=2048)
+def normalize(statement: str) -> str:
+    """
+    Replace literals and bind parameters by ?, collapse IN lists, multi-row VALUES lists and whitespace,
+    so that every execution of the same query shape gives the same text.
+    """
+    statement = _STRING.sub("?", statement)
+    statement = _PARAMETER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("IN (?)", statement)
+    statement = _VALUES_LIST.sub(r"VALUES \1", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Return a short stable id of the statement's shape, usable as a metric label.
+    Shapes beyond SQL_FINGERPRINT_LIMIT are reported as "other" to bound the label cardinality.
+    """
+    normalized = normalize(statement)
+    key = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+    if key not in statements:
+        if len(statements) >= AC.SQL_FINGERPRINT_LIMIT:
+            return "other"
+        statements[key] = normalized
+    return key
@@ -0,0 +1,113 @@
+from opentelemetry import context, propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+
+from .constants import AppConstants as AC
+from .logger import log
+from .sql_fingerprint import normalize
+
+tracer = trace.get_tracer("karari")
+
+
+def configure_tracing() -> bool:
+    """
+    Install the tracer provider and exporter selected by TRACING_EXPORTER (otlp, file or none).
+    The OpenTelemetry SDK and exporters are optional dependencies (the tracing extra).
+    Return True when tracing is enabled.
+    """
+    if AC.TRACING_EXPORTER == "none":
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        if AC.TRACING_EXPORTER == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        log.error(f"Tracing is disabled, install the tracing extra to export spans: {e}")
+        return False
+
+    if AC.TRACING_EXPORTER == "otlp":
+        exporter = OTLPSpanExporter()  # configured by the standard OTEL_EXPORTER_OTLP_* variables
+    else:
+        exporter = ConsoleSpanExporter(
+            out=open(AC.TRACING_FILE, "a"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    provider = TracerProvider(resource=Resource.create({"service.name": AC.TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return True
+
+
+def start_statement_span(connection, cursor, statement, parameters, execution_context, executemany):
+    execution_context.span = tracer.start_span(
+        statement.split(None, 1)[0].upper() if statement else "SQL",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": "postgresql",
+            "db.statement": normalize(statement),  # without literals, they may hold personal data
+            "db.pool": connection.engine.pool.logging_name or "",
+        },
+    )
+
+
+def end_statement_span(connection, cursor, statement, parameters, execution_context, executemany):
+    span = getattr(execution_context, "span", None)
+    if span is not None:
+        span.set_attribute("db.rows", cursor.rowcount)
+        span.end()
+
+
+def fail_statement_span(exception_context):
+    span = getattr(exception_context.execution_context, "span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(Status(StatusCode.ERROR))
+        span.end()
+
+
+def instrument_engines(engines: dict) -> None:
+    """
+    Open a span around every SQL statement of the given engines, with the number of rows it returned or changed.
+    """
+    for engine in engines.values():
+        event.listen(engine.sync_engine, "before_cursor_execute", start_statement_span)
+        event.listen(engine.sync_engine, "after_cursor_execute", end_statement_span)
+        event.listen(engine.sync_engine, "handle_error", fail_statement_span)
+
+
+async def start_request_span(request) -> None:
+    span = tracer.start_span(f"{request.method} {request.url.host}{request.url.path}", kind=SpanKind.CLIENT)
+    span.set_attribute("http.method", request.method)
+    span.set_attribute("http.url", str(request.url.copy_with(query=None)))  # the query string may carry tokens
+    request.extensions["span"] = span
+    propagate.inject(request.headers, context=trace.set_span_in_context(span))
+
+
+async def end_request_span(response) -> None:
+    span = response.request.extensions.get("span")
+    if span is not None:
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_status(Status(StatusCode.ERROR))
+        span.end()
+
+
+def instrument_http_client(event_hooks: dict) -> None:
+    """
+    Open a span around every call of the zeauth client and propagate the trace context to zeauth.
+    """
+    event_hooks["request"].append(start_request_span)
+    event_hooks["response"].append(end_request_span)
+
+
+async def propagate_trace_context(request, call_next):
+    """
+    HTTP middleware continuing the trace given by the incoming traceparent/tracestate headers
+    """
+    token = context.attach(propagate.extract(request.headers))
+    try:
+        return await call_next(request)
+    finally:
+        context.detach(token)
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from core import auth
+from core.auth import Protect, RequestAuth
+from core.cache import TTLCache
+from core.constants import AppConstants as AC
+
+
+def token(expires_in: float = 3600) -> str:
+    payload = {"sub": "user-1", "tenant_id": "tenant-1", "exp": int(time.time() + expires_in)}
+    return jwt.encode(payload, "not verified by this service " * 2, algorithm="HS256")
+
+
+class Zeauth:
+    """
+    Stub of zeauth's /oauth/auth endpoint allowing `roles` among the requested ones.
+    """
+
+    def __init__(self, *roles):
+        self.roles = set(roles)
+        self.status_code = 200
+        self.requests = 0
+
+    def handler(self, request):
+        self.requests += 1
+        if self.status_code != 200:
+            return httpx.Response(self.status_code)
+        requested = json.loads(request.content)["roles"]
+        return httpx.Response(200, json={"allowed_roles": [role for role in requested if role in self.roles]})
+
+
+@pytest.fixture
+def zeauth(monkeypatch):
+    server = Zeauth("admin")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+    monkeypatch.setattr(auth, "get_http_client", lambda: client)
+    monkeypatch.setattr(auth, "token_cache", TTLCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(AC, "AUTH_MODE", "remote")
+    monkeypatch.setattr(AC, "ZEAUTH_BASE_URL", "http://zeauth")
+    return server
+
+
+def test_validation_is_cached(zeauth):
+    protect, request_token = Protect(["admin"]), token()
+
+    async def run():
+        return [await protect.validate_token(request_token) for _ in range(3)]
+
+    assert asyncio.run(run()) == [(True, ["admin"])] * 3
+    assert zeauth.requests == 1
+    assert auth.token_cache.hits == 2
+
+
+def test_cache_ttl_is_capped_at_the_token_expiry(zeauth):
+    protect, request_token = Protect(["admin"]), token(expires_in=5)
+    asyncio.run(protect.validate_token(request_token))
+    _, expires = auth.token_cache._data[(request_token, frozenset(["admin"]))]
+    assert expires - time.monotonic() <= 5
+
+
+def test_expired_token_is_not_cached(zeauth):
+    protect, request_token = Protect(["admin"]), token(expires_in=-5)
+
+    async def run():
+        await protect.validate_token(request_token)
+        await protect.validate_token(request_token)
+
+    asyncio.run(run())
+    assert zeauth.requests == 2
+    assert len(auth.token_cache) == 0
+
+
+def test_one_validation_per_request(zeauth):
+    request_auth = RequestAuth(token())
+
+    async def run():
+        await asyncio.gather(Protect(["admin"]).authorize(request_auth), Protect(["admin", "viewer"]).authorize(request_auth))
+        with pytest.raises(HTTPException) as error:
+            await Protect(["viewer"]).authorize(request_auth)
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 403
+    assert zeauth.requests == 1
+    assert request_auth.roles == frozenset({"admin"})
+
+
+def test_rejected_token(zeauth):
+    zeauth.status_code = 401
+    request_auth = RequestAuth(token())
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(Protect(["admin"]).authorize(request_auth))
+    assert error.value.status_code == 403
+    assert not request_auth.is_valid
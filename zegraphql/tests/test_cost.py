@@ -0,0 +1,94 @@
+import asyncio
+from typing import List
+
+import pytest
+import strawberry
+from graphql import GraphQLError, get_operation_ast, parse
+
+from core.constants import AppConstants as AC
+from core.cost import QueryCost, TokenBucket
+
+
+@strawberry.type
+class Item:
+    name: str
+
+    @strawberry.field
+    def children(self) -> List["Item"]:
+        return []
+
+
+@strawberry.type
+class ItemConnection:
+    edges: List[Item]
+
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    def items(self, first: int = 10) -> ItemConnection:
+        return ItemConnection(edges=[])
+
+
+schema = strawberry.Schema(query=Query)
+
+
+class ExecutionContext:
+    def __init__(self, query: str, variables: dict = None):
+        self.schema = schema
+        self.graphql_document = parse(query)
+        self.operation_name = None
+        self.variables = variables
+
+
+def cost(query: str, variables: dict = None) -> float:
+    extension = QueryCost(execution_context=ExecutionContext(query, variables))
+    document = extension.execution_context.graphql_document
+    operation = get_operation_ast(document)
+    fragments = {d.name.value: d for d in document.definitions if d.kind == "fragment_definition"}
+    return extension.selection_cost(operation.selection_set, schema._schema.query_type, fragments, variables or {}, None)
+
+
+def test_default_page_size():
+    # the connection costs 1, each of its 10 edges 1, scalars are free
+    assert cost("{ items { edges { name } } }") == 1 + 10
+
+
+def test_page_size_argument_and_variable():
+    assert cost("{ items(first: 3) { edges { name } } }") == 1 + 3
+    assert cost("query Q($n: Int!) { items(first: $n) { edges { name } } }", {"n": 5}) == 1 + 5
+
+
+def test_page_size_is_capped():
+    assert cost("{ items(first: 1000000) { edges { name } } }") == 1 + AC.MAX_PAGE_SIZE
+
+
+def test_negative_page_size_costs_nothing():
+    assert cost("{ items(first: -100000) { edges { name } } }") == 1
+
+
+def test_aliased_negative_page_size_does_not_offset_siblings():
+    expensive = cost("{ items(first: 100) { edges { children { name } } } }")
+    assert cost("{ a: items(first: 100) { edges { children { name } } } b: items(first: -100000) { edges { children { name } } } }") == expensive + 1
+
+
+def test_nested_lists_multiply():
+    assert cost("{ items(first: 2) { edges { children { name } } } }") == 1 + 2 * (1 + AC.COST_DEFAULT_LIST_SIZE)
+
+
+def test_fragments_are_counted():
+    assert cost("{ ...F } fragment F on Query { items(first: 4) { edges { ... on Item { name } } } }") == 1 + 4
+
+
+def test_token_bucket():
+    bucket = TokenBucket(capacity=10, rate=0)
+    assert bucket.consume(6)
+    assert not bucket.consume(6)
+    assert bucket.consume(4)
+
+
+def test_too_costly():
+    extension = QueryCost(execution_context=ExecutionContext("{ items { edges { name } } }"))
+    with pytest.raises(GraphQLError) as error:
+        asyncio.run(extension.charge(AC.MAX_QUERY_COST + 1))
+    assert error.value.extensions["code"] == "QUERY_TOO_COSTLY"
@@ -0,0 +1,45 @@
+import pytest
+
+from core.constants import AppConstants as AC
+from core.db_config import pool_sizes
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    def apply(pool_size=10, max_overflow=5, total=0, workers=1):
+        monkeypatch.setattr(AC, "DB_POOL_SIZE", pool_size)
+        monkeypatch.setattr(AC, "DB_MAX_OVERFLOW", max_overflow)
+        monkeypatch.setattr(AC, "DB_TOTAL_CONNECTIONS", total)
+        monkeypatch.setattr(AC, "WORKERS", workers)
+    return apply
+
+
+def test_without_budget(settings):
+    settings(pool_size=10, max_overflow=5)
+    assert pool_sizes() == (10, 5)
+
+
+@pytest.mark.parametrize("total, workers", [(60, 4), (30, 2), (7, 3), (4, 4), (1, 1)])
+def test_budget_is_split_between_workers(settings, total, workers):
+    settings(pool_size=10, max_overflow=5, total=total, workers=workers)
+    pool_size, max_overflow = pool_sizes()
+    assert pool_size >= 1 and max_overflow >= 0
+    assert (pool_size + max_overflow) * workers <= total
+
+
+def test_budget_keeps_the_overflow_ratio(settings):
+    settings(pool_size=10, max_overflow=5, total=60, workers=4)
+    assert pool_sizes() == (10, 5)
+
+
+def test_budget_below_the_workers_is_rejected(settings):
+    settings(total=3, workers=4)
+    with pytest.raises(ValueError):
+        pool_sizes()
+
+
+@pytest.mark.parametrize("pool_size, max_overflow", [(0, 0), (0, 5), (10, -1)])
+def test_invalid_pool_settings_are_rejected(settings, pool_size, max_overflow):
+    settings(pool_size=pool_size, max_overflow=max_overflow, total=20, workers=2)
+    with pytest.raises(ValueError):
+        pool_sizes()
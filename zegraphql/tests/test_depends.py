@@ -0,0 +1,89 @@
+import contextvars
+from types import SimpleNamespace
+
+import pytest
+
+from core import depends
+
+
+class FakeConnection:
+    """
+    Connection stub with the info dict of its pooled DBAPI connection, recording the statements it runs.
+    """
+
+    def __init__(self):
+        self.info = {}
+        self.invalidated = False
+        self.executed = []
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(parameters)
+
+
+def begin(connection, user="user-1", roles=("admin",), tenant="tenant-1"):
+    def run():
+        depends.user_session.set(user)
+        depends.user_roles.set(list(roles))
+        depends.tenant_id.set(tenant)
+        depends.execute_after_begin_transaction(None, None, connection)
+    contextvars.copy_context().run(run)
+
+
+@pytest.fixture
+def connection():
+    return FakeConnection()
+
+
+def test_identity_is_sent_on_a_new_connection(connection):
+    begin(connection)
+    assert connection.executed == [{"id": "user-1", "roles": "admin", "tenant_id": "tenant-1"}]
+    assert depends.PENDING_IDENTITY_KEY in connection.info
+
+
+def test_identity_is_skipped_on_a_matching_committed_connection(connection):
+    begin(connection)
+    depends.keep_connection_identity(connection)
+    begin(connection)
+    assert len(connection.executed) == 1
+    begin(connection, user="user-2")
+    assert len(connection.executed) == 2
+
+
+def test_identity_is_skipped_within_the_same_transaction(connection):
+    begin(connection)
+    begin(connection)
+    assert len(connection.executed) == 1
+
+
+def test_identity_is_sent_again_after_a_rollback(connection):
+    begin(connection)
+    depends.keep_connection_identity(connection)
+    depends.drop_connection_identity(connection)
+    assert connection.info == {}
+    begin(connection)
+    assert len(connection.executed) == 2
+
+
+def test_identity_is_sent_again_after_a_failed_commit(connection):
+    begin(connection, user="user-1")
+    depends.keep_connection_identity(connection)
+    begin(connection, user="user-2")
+    depends.keep_connection_identity(connection)  # commit event, then COMMIT fails
+    depends.forget_connection_identity(SimpleNamespace(connection=connection))
+    begin(connection, user="user-2")
+    assert [parameters["id"] for parameters in connection.executed] == ["user-1", "user-2", "user-2"]
+
+
+def test_invalidated_connection_is_left_alone(connection):
+    begin(connection)
+    connection.invalidated = True
+    depends.forget_connection_identity(SimpleNamespace(connection=connection))
+    depends.forget_connection_identity(SimpleNamespace(connection=None))
+    assert depends.PENDING_IDENTITY_KEY in connection.info
+
+
+def test_pool_reset_drops_the_pending_identity(connection):
+    begin(connection)
+    record = SimpleNamespace(info=connection.info)
+    depends.drop_pooled_connection_identity(None, record, None)
+    assert depends.PENDING_IDENTITY_KEY not in connection.info
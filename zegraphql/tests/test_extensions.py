@@ -0,0 +1,12 @@
+from core import extensions
+from core.constants import AppConstants as AC
+
+
+def test_operation_names_are_capped(monkeypatch):
+    monkeypatch.setattr(extensions, "operation_names", set())
+    monkeypatch.setattr(AC, "METRICS_OPERATION_LIMIT", 2)
+    assert extensions.operation_label(None) == "anonymous"
+    assert extensions.operation_label("A") == "A"
+    assert extensions.operation_label("B") == "B"
+    assert extensions.operation_label("C") == "other"
+    assert extensions.operation_label("A") == "A"
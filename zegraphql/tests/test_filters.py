@@ -0,0 +1,56 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from business.db_models.documents_model import DocumentModel
+from business.db_models.summary_tasks_model import SummaryTaskModel
+from business.types import DocumentFilter, DocumentStatusEnum, DocumentStatusFilter, SummaryTaskFilter
+from core.filters import DateFilter, StringArrayFilter, StringFilter, compile_filter
+
+
+def compiled(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_no_filter():
+    assert compile_filter(DocumentModel, None) is None
+
+
+def test_fields_are_anded():
+    sql = compiled(compile_filter(DocumentModel, DocumentFilter(
+        name=StringFilter(ilike="report"),
+        status=DocumentStatusFilter(in_=[DocumentStatusEnum.new, DocumentStatusEnum.failed]),
+        release_date=DateFilter(is_null=True),
+    )))
+    assert "documents.name ILIKE 'report'" in sql
+    assert "documents.status IN ('new', 'failed')" in sql
+    assert "documents.release_date IS NULL" in sql
+    assert " AND " in sql
+
+
+def test_nested_or_and_not():
+    sql = compiled(compile_filter(DocumentModel, DocumentFilter(
+        or_=[DocumentFilter(name=StringFilter(eq="a")), DocumentFilter(name=StringFilter(eq="b"))],
+        not_=DocumentFilter(tags=StringFilter(in_=["x", "y"])),
+    )))
+    assert "documents.name = 'a' OR" in sql
+    assert "documents.name = 'b'" in sql
+    assert "documents.tags NOT IN ('x', 'y')" in sql
+
+
+def test_empty_or_matches_nothing():
+    sql = compiled(compile_filter(DocumentModel, DocumentFilter(or_=[])))
+    assert "false" in sql
+
+
+def test_array_operators():
+    sql = compiled(compile_filter(SummaryTaskModel, SummaryTaskFilter(tags=StringArrayFilter(contains=["a"], overlaps=["b"]))))
+    assert "@>" in sql and "&&" in sql
+
+
+def test_unsupported_operator():
+    operators = StringFilter(eq="a")
+    operators.unknown = "b"
+    with pytest.raises(HTTPException) as error:
+        compile_filter(DocumentModel, DocumentFilter(name=operators))
+    assert error.value.status_code == 400
@@ -0,0 +1,108 @@
+import asyncio
+import base64
+import time
+
+import httpx
+import jwt
+import pytest
+
+from core import auth, jwks
+from core.auth import Protect, RequestAuth
+from core.constants import AppConstants as AC
+
+SECRETS = {"key-1": b"first signing secret, " * 4, "key-2": b"second signing secret, " * 4}  # HMAC keys, the JWKS logic is the same as for RSA
+
+
+def jwk(kid: str) -> dict:
+    return {"kty": "oct", "kid": kid, "alg": "HS256", "k": base64.urlsafe_b64encode(SECRETS[kid]).rstrip(b"=").decode()}
+
+
+def token(kid: str = "key-1", algorithm: str = "HS256", expires_in: float = 60, **claims) -> str:
+    payload = {"sub": "user-1", "tenant_id": "tenant-1", "exp": int(time.time() + expires_in), **claims}
+    return jwt.encode(payload, SECRETS[kid], algorithm=algorithm, headers={"kid": kid})
+
+
+class KeyServer:
+    """
+    Stub JWKS endpoint serving the keys listed in `kids`.
+    """
+
+    def __init__(self, *kids):
+        self.kids = list(kids)
+        self.requests = 0
+
+    def handler(self, request):
+        self.requests += 1
+        return httpx.Response(200, json={"keys": [jwk(kid) for kid in self.kids]})
+
+
+@pytest.fixture
+def key_server(monkeypatch):
+    server = KeyServer("key-1")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+    monkeypatch.setattr(jwks, "get_http_client", lambda: client)
+    monkeypatch.setattr(AC, "AUTH_JWT_ALGORITHMS", ["HS256"])
+    monkeypatch.setattr(AC, "AUTH_JWT_AUDIENCE", None)
+    return server
+
+
+@pytest.fixture
+def client(key_server, monkeypatch):
+    client = jwks.JWKSClient("http://zeauth/.well-known/jwks.json", refresh_interval=300)
+    monkeypatch.setattr(auth, "jwks_client", client)
+    return client
+
+
+def test_valid_token(client, key_server):
+    claims = asyncio.run(client.verify(token()))
+    assert claims["sub"] == "user-1"
+    assert key_server.requests == 1
+
+
+def test_expired_token(client):
+    with pytest.raises(jwt.ExpiredSignatureError):
+        asyncio.run(client.verify(token(expires_in=-10)))
+
+
+def test_unknown_kid_forces_a_refresh(client, key_server):
+    async def run():
+        await client.refresh()
+        key_server.kids.append("key-2")  # rotation on the zeauth side
+        client._last_refresh = time.monotonic() - client.min_refresh_interval - 1
+        return await client.verify(token(kid="key-2"))
+
+    assert asyncio.run(run())["sub"] == "user-1"
+    assert key_server.requests == 2
+
+
+def test_unknown_kid_within_the_refresh_interval(client, key_server):
+    async def run():
+        await client.refresh()
+        return await client.verify(token(kid="key-2"))
+
+    with pytest.raises(jwt.InvalidKeyError):
+        asyncio.run(run())
+    assert key_server.requests == 1
+
+
+def test_algorithm_outside_the_pinned_list(client):
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        asyncio.run(client.verify(token(algorithm="HS512")))
+
+
+@pytest.mark.parametrize("roles, expected", [(["admin", "viewer"], ["admin"]), ("admin", ["admin"]), (None, [])])
+def test_local_validation_reads_the_roles_claim(client, monkeypatch, roles, expected):
+    monkeypatch.setattr(AC, "AUTH_MODE", "local")
+    assert asyncio.run(Protect(["admin"]).validate_token(token(roles=roles))) == (True, expected)
+
+
+def test_local_validation_rejects_invalid_tokens(client, monkeypatch):
+    monkeypatch.setattr(AC, "AUTH_MODE", "local")
+    assert asyncio.run(Protect(["admin"]).validate_token(token(expires_in=-10))) == (False, [])
+
+
+def test_string_roles_claim_in_request_auth(client, monkeypatch):
+    monkeypatch.setattr(AC, "AUTH_MODE", "local")
+    request_auth = RequestAuth(token(roles="admin"))
+    asyncio.run(request_auth.resolve())
+    assert request_auth.is_valid and request_auth.roles == frozenset({"admin"})
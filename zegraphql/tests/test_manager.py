@@ -0,0 +1,157 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.dml import Insert
+
+import business.db_models.documents_model  # noqa: F401, resolves the relationships of IndustryModel
+from business.db_models.industries_model import IndustryModel
+from business.mutations.industries import IndustryMutation
+from business.types import CreateIndustryInput
+from core.constants import AppConstants as AC
+from core.custom_exceptions import TriggerException
+from core.manager import Manager
+
+
+class Hooks:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.cancelled = []
+
+    async def hook(self, old_data, **kwargs):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01 * old_data["delay"])
+            if old_data.get("fail"):
+                raise ValueError("trigger failed")
+            return old_data["id"]
+        except asyncio.CancelledError:
+            self.cancelled.append(old_data["id"])
+            raise
+        finally:
+            self.running -= 1
+
+
+def manager() -> Manager:
+    return Manager(object, database=object())
+
+
+def test_triggers_run_one_after_the_other_by_default(monkeypatch):
+    monkeypatch.setattr(AC, "TRIGGER_CONCURRENCY", 1)
+    hooks = Hooks()
+    rows = [{"id": index, "delay": 1} for index in range(3)]
+    assert asyncio.run(manager()._gather_hooks(hooks.hook, rows)) == [0, 1, 2]
+    assert hooks.max_running == 1
+
+
+def test_concurrent_triggers_are_bounded(monkeypatch):
+    monkeypatch.setattr(AC, "TRIGGER_CONCURRENCY", 2)
+    hooks = Hooks()
+    rows = [{"id": index, "delay": 1} for index in range(5)]
+    assert asyncio.run(manager()._gather_hooks(hooks.hook, rows)) == [0, 1, 2, 3, 4]
+    assert hooks.max_running == 2
+
+
+def test_failing_trigger_cancels_the_others(monkeypatch):
+    monkeypatch.setattr(AC, "TRIGGER_CONCURRENCY", 3)
+    hooks = Hooks()
+    rows = [{"id": 0, "delay": 0, "fail": True}, {"id": 1, "delay": 10}, {"id": 2, "delay": 10}]
+    with pytest.raises(ValueError):
+        asyncio.run(manager()._gather_hooks(hooks.hook, rows))
+    assert sorted(hooks.cancelled) == [1, 2]
+    assert hooks.running == 0
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """
+    Session stub answering the lookup of existing records and echoing the rows of INSERT ... RETURNING.
+    """
+
+    def __init__(self, existing=()):
+        self.info = {"unit_of_work": True}
+        self.existing = list(existing)
+        self.inserts = []
+
+    async def execute(self, statement, **kwargs):
+        if isinstance(statement, Insert):
+            self.inserts.append(statement)
+            return Result([IndustryModel(**row) for row in inserted_rows(statement)])
+        return Result(self.existing)
+
+    async def flush(self):
+        pass
+
+
+def inserted_rows(statement) -> list[dict]:
+    return [{getattr(key, "key", key): value for key, value in row.items()} for row in statement._multi_values[0]]
+
+
+def upsert(session, items, **kwargs):
+    return asyncio.run(IndustryModel.objects(session).upsert_multiple(items, **kwargs))
+
+
+def test_upsert_merges_repeated_ids():
+    obj_id = uuid.uuid4()
+    session = FakeSession()
+    saved, errors_info = upsert(session, [
+        {"id": str(obj_id), "industry_name": "first"},
+        {"id": str(obj_id).upper(), "industry_name": "second"},
+        {"industry_name": "other"},
+    ])
+    assert errors_info == []
+    assert len(session.inserts) == 1
+    rows = inserted_rows(session.inserts[0])
+    assert [row["industry_name"] for row in rows] == ["second", "other"]
+    assert [obj.industry_name for obj in saved] == ["second", "second", "other"]
+    assert saved[0].id == obj_id
+
+
+def test_upsert_groups_rows_by_column_set():
+    session = FakeSession()
+    upsert(session, [{"industry_name": "a"}, {"industry_name": "b"}, {"tenant_id": uuid.uuid4()}])
+    assert [len(inserted_rows(statement)) for statement in session.inserts] == [2, 1]
+    names, tenants = [str(statement.compile(dialect=postgresql.dialect())) for statement in session.inserts]
+    assert "industry_name = excluded.industry_name" in names
+    assert "tenant_id = excluded.tenant_id" in tenants and "industry_name = excluded" not in tenants
+
+
+def test_upsert_returns_the_rejected_items(monkeypatch):
+    async def pre_create(self, **kwargs):
+        if kwargs["new_data"]["industry_name"] == "bad":
+            raise HTTPException(400, {"trigger_name": "check_name", "message": "rejected"})
+        return kwargs["new_data"]
+
+    monkeypatch.setattr(Manager, "pre_create", pre_create)
+    session = FakeSession()
+    saved, errors_info = upsert(session, [{"industry_name": "ok"}, {"industry_name": "bad"}], signal_data={"jwt": None})
+    assert [obj.industry_name for obj in saved] == ["ok"]
+    assert errors_info == [{"index": 1, "errors": {"trigger_name": "check_name", "message": "rejected"}}]
+
+
+def test_upsert_mutation_raises_the_rejected_items(monkeypatch):
+    async def upsert_multiple(self, items, **kwargs):
+        return [], [{"index": 0, "errors": {"message": "rejected"}}]
+
+    monkeypatch.setattr(Manager, "upsert_multiple", upsert_multiple)
+    resolver = IndustryMutation.upsert_multiple_industries
+    info = SimpleNamespace(context=SimpleNamespace(db=FakeSession(), jwt=None, request=SimpleNamespace(base_url="http://karari/")))
+    with pytest.raises(TriggerException) as error:
+        asyncio.run(resolver(None, [CreateIndustryInput(industry_name="a")], info))
+    assert error.value.status_code == 422
+    assert error.value.detail == [{"index": 0, "errors": {"message": "rejected"}}]
@@ -0,0 +1,25 @@
+import datetime
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_on = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)
+    obj_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(created_on, obj_id)) == (created_on, obj_id)
+
+
+def test_cursor_id_is_a_uuid():
+    _, obj_id = decode_cursor(encode_cursor(datetime.datetime.now(), str(uuid.uuid4())))
+    assert isinstance(obj_id, uuid.UUID)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm8tc2VwYXJhdG9y", encode_cursor(datetime.datetime.now(), "not-a-uuid")])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
@@ -0,0 +1,33 @@
+from core.sql_fingerprint import fingerprint, normalize
+
+
+def test_literals_and_parameters_are_replaced():
+    assert normalize("SELECT * FROM t WHERE a = 'x''y' AND b = 42 AND c = $1 AND d = %(d)s AND e = :e") == \
+        "SELECT * FROM t WHERE a = ? AND b = ? AND c = ? AND d = ? AND e = ?"
+
+
+def test_casts_are_kept():
+    assert normalize("SELECT a::text FROM t WHERE b = $1::UUID") == "SELECT a::text FROM t WHERE b = ?::UUID"
+
+
+def test_in_lists_and_whitespace_are_collapsed():
+    assert normalize("SELECT *\n  FROM t WHERE id IN (1, 2,   3)") == "SELECT * FROM t WHERE id IN (?)"
+
+
+def test_same_shape_same_fingerprint():
+    assert fingerprint("SELECT * FROM t WHERE id = 1") == fingerprint("SELECT * FROM t WHERE id = 2")
+    assert fingerprint("SELECT * FROM t WHERE id = 1") != fingerprint("SELECT * FROM u WHERE id = 1")
+
+
+def test_cast_in_lists_are_collapsed():
+    one = "SELECT * FROM t WHERE t.id IN ($1::UUID)"
+    many = "SELECT * FROM t WHERE t.id IN ($1::UUID, $2::UUID, $3::UUID)"
+    assert normalize(many) == "SELECT * FROM t WHERE t.id IN (?)"
+    assert fingerprint(one) == fingerprint(many)
+
+
+def test_multi_row_values_are_collapsed():
+    one = "INSERT INTO t (a, b) VALUES ($1::VARCHAR, $2::UUID) ON CONFLICT (id) DO NOTHING"
+    many = "INSERT INTO t (a, b) VALUES ($1::VARCHAR, $2::UUID), ($3::VARCHAR, $4::UUID), ($5::VARCHAR, $6::UUID) ON CONFLICT (id) DO NOTHING"
+    assert normalize(many) == "INSERT INTO t (a, b) VALUES (?::VARCHAR, ?::UUID) ON CONFLICT (id) DO NOTHING"
+    assert fingerprint(one) == fingerprint(many)